@@ -1,20 +1,42 @@
-import multiprocessing
+import time
+STARTUP_T0 = time.perf_counter()
+from sorteo.startup import StartupTimer
+startup_timer = StartupTimer(STARTUP_T0)
 import os
-import shutil
 import json
+import sys
+import threading
+from datetime import datetime
+from sorteo import SortEngine, SortError, SortOptions, STRUCTURES, journal, manifest, plan
+from sorteo.jobs import Job, JobScheduler
+from sorteo.capture import DATE_SOURCES
+from sorteo.copying import COPY_STRATEGIES
+from sorteo.dedup import DEDUP_MODES
+from sorteo.logpipe import LogPipeline, prune_logs
+from sorteo.results import STATUSES, ResultStore
+from sorteo.watch import FolderWatcher
+from sorteo.rules import RuleRouter
+from sorteo.templates import FIELD_HELP, CompiledTemplate, TemplateError
+startup_timer.mark("import_sorteo")
 import customtkinter
 from tkinter import filedialog
-from datetime import datetime
-import threading
-import sys
-import requests
-import webbrowser
-import ctypes
-from PIL import Image
-import subprocess
+startup_timer.mark("import_customtkinter")
+# requests, PIL, webbrowser and ctypes are imported where they are used, so they stay off the startup path.
 
 # --- CONSTANTS ---
 GITHUB_VERSION_URL = "https://raw.githubusercontent.com/madmalio/sorteo/main/version.json"
+WORKER_CHOICES = ["1", "2", "4", "8", "16"]
+SCAN_WORKER_CHOICES = ["1", "4", "8", "16", "32"]
+JOBS_PER_DEVICE_CHOICES = ["1", "2", "4"]
+BANDWIDTH_CHOICES = ["No limit", "10", "25", "50", "100", "250"]  # MB/s
+LOG_POLL_MS = 40            # how often the UI drains the log queue
+LOG_LINES_PER_FRAME = 400   # most lines inserted into the log area per drain
+LOG_MAX_LINES = 5000        # ring buffer size of the log area; the log file keeps everything
+PROGRESS_TEXT_S = 0.5       # how often the throughput/ETA text next to the progress bar is refreshed
+RESULT_ROW_HEIGHT = 20      # pixels per row of the results table
+RESULT_ROWS_PER_FRAME = 200000  # most result rows a filter tests per drain, so refiltering a huge run never blocks the UI
+RESULT_FILTER_DELAY_MS = 250    # typing pause before the results filter is applied
+WATCH_RESULT_ROWS = 100000      # most result rows kept while watching; the table then starts over, so weeks of watching stay bounded
 
 # --- HELPER FUNCTION ---
 def resource_path(relative_path):
@@ -28,6 +50,20 @@ def resource_path(relative_path):
     return os.path.join(base_path, relative_path)
 
 
+def app_data_path(*parts):
+    """Path in the per-user data folder, which is writable wherever the app was started from."""
+    if sys.platform == "win32": base = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.expanduser(r"~\AppData\Local"), "Sorteo")
+    elif sys.platform == "darwin": base = os.path.expanduser("~/Library/Application Support/Sorteo")
+    else: base = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "sorteo")
+    return os.path.join(base, *parts)
+
+
+LOG_DIR = app_data_path("logs")          # one log file per run; the oldest beyond LOG_KEEP are deleted
+LOG_KEEP = 50
+JOURNAL_DIR = app_data_path("journals")  # crash journals of Move runs, checked at startup
+PLAN_DIR = app_data_path("plans")        # plans saved by dry runs, run by the next Start Sorting
+
+
 class CustomMessageBox(customtkinter.CTkToplevel):
     """A custom messagebox that matches the app's theme."""
     def __init__(self, master, title="MessageBox", message="Message", on_close=None):
@@ -112,6 +148,86 @@ class CustomQuestionBox(customtkinter.CTkToplevel):
         self.destroy()
 
 
+class ResultsTable(customtkinter.CTkFrame):
+    """Source/destination/action/status table that only draws the rows in view.
+
+    The rows come from a :class:`ResultView`; the canvas holds one set of text
+    items per visible row and rewrites them on scroll, so a run of a million
+    files costs no more widgets than a run of ten.
+    """
+    COLUMNS = (("Source", 0.42), ("Destination", 0.42), ("Action", 0.08), ("Status", 0.08))
+
+    def __init__(self, master, **kwargs):
+        super().__init__(master, **kwargs)
+        self.grid_columnconfigure(0, weight=1); self.grid_rowconfigure(0, weight=1)
+        self.view = None; self.top = 0; self._items = []; self._columns = []
+        self.font = customtkinter.CTkFont(family="Consolas", size=12)
+        self._char_width = max(1, self.font.measure("0"))
+        self.canvas = customtkinter.CTkCanvas(self, highlightthickness=0, borderwidth=0)
+        self.canvas.grid(row=0, column=0, sticky="nsew")
+        self.scrollbar = customtkinter.CTkScrollbar(self, command=self._on_scrollbar); self.scrollbar.grid(row=0, column=1, sticky="ns")
+        self.canvas.bind("<Configure>", lambda event: self._layout())
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"): self.canvas.bind(sequence, self._on_wheel)
+
+    def _colors(self):
+        theme = customtkinter.ThemeManager.theme
+        return (self._apply_appearance_mode(theme["CTkTextbox"]["fg_color"]), self._apply_appearance_mode(theme["CTkLabel"]["text_color"]),
+                self._apply_appearance_mode(theme["CTkButton"]["fg_color"]))
+
+    def _set_appearance_mode(self, mode_string):
+        super()._set_appearance_mode(mode_string); self._layout()
+
+    @property
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // RESULT_ROW_HEIGHT - 1)  # minus the header row
+
+    def set_view(self, view):
+        self.view = view; self.top = 0; self.refresh()
+
+    def _layout(self):
+        """Recreates the header and the text items for the rows that fit the canvas."""
+        background, text, accent = self._colors()
+        self.canvas.delete("all"); self.canvas.configure(bg=background)
+        width = max(1, self.canvas.winfo_width()); x = 4; self._columns = []
+        for title, share in self.COLUMNS:
+            column_width = int(width * share)
+            self._columns.append((x, max(4, column_width // self._char_width - 1)))
+            self.canvas.create_text(x, RESULT_ROW_HEIGHT // 2, text=title, anchor="w", fill=accent, font=self.font)
+            x += column_width
+        self._items = [[self.canvas.create_text(x, (n + 1.5) * RESULT_ROW_HEIGHT, anchor="w", fill=text, font=self.font) for x, _ in self._columns]
+                       for n in range(self.visible_rows)]
+        self.refresh()
+
+    @staticmethod
+    def _fit(value, chars):
+        return value if len(value) <= chars else "…" + value[-(chars - 1):]  # keep the end of a path: the file name
+
+    def refresh(self):
+        """Rewrites the visible rows and the scrollbar; call when the view or the scroll position changed."""
+        total = len(self.view) if self.view is not None else 0
+        self.top = max(0, min(self.top, total - len(self._items)))
+        for n, items in enumerate(self._items):
+            position = self.top + n
+            values = self.view.row(position) if position < total else ("", "", "", "")
+            for item, value, (_, chars) in zip(items, values, self._columns): self.canvas.itemconfigure(item, text=self._fit(value, chars))
+        if total: self.scrollbar.set(self.top / total, min(1.0, (self.top + len(self._items)) / total))
+        else: self.scrollbar.set(0, 1)
+
+    def _scroll_to(self, top):
+        self.top = int(top); self.refresh()
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto": self._scroll_to(float(amount) * len(self.view or ()))
+        elif unit == "pages": self._scroll_to(self.top + int(amount) * len(self._items))
+        else: self._scroll_to(self.top + int(amount))
+
+    def _on_wheel(self, event):
+        if event.num == 4: step = -3
+        elif event.num == 5: step = 3
+        else: step = -3 if event.delta > 0 else 3
+        self._scroll_to(self.top + step)
+
+
 class FileSorterApp(customtkinter.CTk):
     APP_VERSION = "1.0.0"
     
@@ -128,8 +244,15 @@ class FileSorterApp(customtkinter.CTk):
 
         # --- State Variables ---
         self.config_file = "sorter_config.json"
-        self.file_type_selector_window = None; self.settings_window = None; self.about_window = None
+        self.file_type_selector_window = None; self.settings_window = None; self.about_window = None; self.queue_window = None; self.rules_window = None
         self.checkbox_vars = {}; self.operation_mode_var = customtkinter.StringVar()
+        self.log_pipeline = LogPipeline(); self.sort_running = False; self.sort_progress = 0
+        self.sort_engine = None; self._progress_text_at = 0
+        self.last_plan = None  # (plan path, options dict) of the last dry run; Start Sorting executes it if nothing changed
+        self.watch_stop = None  # set while watching the origin folder
+        self.job_queue = []; self.jobs_per_device = "1"; self.job_progress = {}  # queued Jobs; job -> (done, total) while the queue runs
+        self.results = ResultStore(); self.result_view = self.results.view(); self._result_rows = 0; self._filter_job = None
+        self._drain_job = None  # pending _drain_log call, so only one drain loop ever runs
 
         self.load_and_apply_settings()
 
@@ -148,24 +271,20 @@ class FileSorterApp(customtkinter.CTk):
         title_frame.grid(row=0, column=0, sticky="ew", padx=10, pady=(10,0))
         title_frame.grid_columnconfigure(0, weight=1)
 
-        try:
-            logo_image = customtkinter.CTkImage(
-                light_image=Image.open(resource_path("images/sorteo_logo_lightmode.png")),
-                dark_image=Image.open(resource_path("images/sorteo_logo_darkmode.png")),
-                size=(122, 32)
-            )
-            logo_label = customtkinter.CTkLabel(title_frame, image=logo_image, text="")
-            logo_label.grid(row=0, column=0, sticky="w", padx=10)
-        except Exception as e:
-            print(f"Error loading logo: {e}")
-            customtkinter.CTkLabel(title_frame, text="Sorteo", font=customtkinter.CTkFont(size=20, weight="bold")).grid(row=0, column=0, sticky="w", padx=10)
+        # Text placeholder; the logo PNGs are decoded in _after_first_paint so they don't delay the window.
+        self.logo_label = customtkinter.CTkLabel(title_frame, text="Sorteo", font=customtkinter.CTkFont(size=20, weight="bold"))
+        self.logo_label.grid(row=0, column=0, sticky="w", padx=10)
         
         button_frame = customtkinter.CTkFrame(title_frame, fg_color="transparent")
         button_frame.grid(row=0, column=1, sticky="e")
+        self.queue_button = customtkinter.CTkButton(button_frame, text="Jobs (0)", width=70, command=self.open_queue_window)
+        self.queue_button.grid(row=0, column=1, padx=(5,0))
+        self.undo_button = customtkinter.CTkButton(button_frame, text="Undo Last Run", width=110, command=self.undo_last_run)
+        self.undo_button.grid(row=0, column=0, padx=(5,0))
         settings_button = customtkinter.CTkButton(button_frame, text="⚙", width=30, command=self.open_settings_window)
-        settings_button.grid(row=0, column=0, padx=5)
+        settings_button.grid(row=0, column=2, padx=5)
         about_button = customtkinter.CTkButton(button_frame, text="?", width=30, command=self.open_about_window)
-        about_button.grid(row=0, column=1, padx=(0,5))
+        about_button.grid(row=0, column=3, padx=(0,5))
         
         path_frame = customtkinter.CTkFrame(main_frame); path_frame.grid(row=0, column=0, sticky="ew", pady=(0, 10)); path_frame.grid_columnconfigure(1, weight=1)
         customtkinter.CTkLabel(path_frame, text="Origin Folder", font=customtkinter.CTkFont(weight="bold")).grid(row=0, column=0, padx=15, pady=(15, 5), sticky="w")
@@ -181,7 +300,7 @@ class FileSorterApp(customtkinter.CTk):
         customtkinter.CTkButton(options_frame, text="Select...", width=100, command=self.open_file_type_selector).grid(row=0, column=2, padx=(0, 15), pady=15)
         
         customtkinter.CTkLabel(options_frame, text="Sorting Structure", font=customtkinter.CTkFont(weight="bold")).grid(row=1, column=0, padx=15, pady=(5, 15), sticky="w")
-        structure_options = ["Year/Month", "Year/Month/Day", "File Type", "File Type/Year/Month", "Topic/Year/Month", "Custom..."]
+        structure_options = STRUCTURES
         
         def on_structure_change(choice):
             if "Topic" in choice or "Custom" in choice:
@@ -195,7 +314,8 @@ class FileSorterApp(customtkinter.CTk):
                 self.custom_frame.grid_forget()
 
         self.sorting_structure_menu = customtkinter.CTkOptionMenu(options_frame, values=structure_options, command=on_structure_change)
-        self.sorting_structure_menu.grid(row=1, column=1, columnspan=2, padx=(0, 15), pady=(5, 15), sticky="w")
+        self.sorting_structure_menu.grid(row=1, column=1, padx=(0, 10), pady=(5, 15), sticky="w")
+        self.rules_button = customtkinter.CTkButton(options_frame, text="Rules...", width=100, command=self.open_rules_window); self.rules_button.grid(row=1, column=2, padx=(0, 15), pady=(5, 15))
         self.sorting_structure_menu.set(structure_options[0])
 
         self.topic_frame = customtkinter.CTkFrame(options_frame, fg_color="transparent")
@@ -209,23 +329,74 @@ class FileSorterApp(customtkinter.CTk):
         self.custom_entry = customtkinter.CTkEntry(self.custom_frame, placeholder_text="{topic}/{type}/{year}-{month}")
         self.custom_entry.grid(row=0, column=1, sticky="ew", padx=15, pady=(5,5))
         self.custom_frame.grid_columnconfigure(1, weight=1)
-        customtkinter.CTkLabel(self.custom_frame, text="Use: {type} {topic} {year} {month} {day}", text_color="gray", font=customtkinter.CTkFont(size=10)).grid(row=1, column=1, sticky="w", padx=15, pady=(0,10))
+        customtkinter.CTkLabel(self.custom_frame, text=f"Use: {FIELD_HELP}", text_color="gray", font=customtkinter.CTkFont(size=10)).grid(row=1, column=1, sticky="w", padx=15, pady=(0,10))
 
         customtkinter.CTkLabel(options_frame, text="Other", font=customtkinter.CTkFont(weight="bold")).grid(row=4, column=0, padx=15, pady=(5, 15), sticky="w")
         self.recursive_sort = customtkinter.CTkCheckBox(options_frame, text="Include subfolders (thorough sort)"); self.recursive_sort.grid(row=4, column=1, sticky="w")
-
-        self.log_area = customtkinter.CTkTextbox(main_frame, state="disabled", font=("Consolas", 12)); self.log_area.grid(row=2, column=0, sticky="nsew", pady=10)
+        self.incremental_sort = customtkinter.CTkCheckBox(options_frame, text="Skip files already sorted by a previous run"); self.incremental_sort.grid(row=5, column=1, sticky="w", pady=(0, 15))
+
+        output_tabs = customtkinter.CTkTabview(main_frame, height=200); output_tabs.grid(row=2, column=0, sticky="nsew")
+        log_tab = output_tabs.add("Log"); results_tab = output_tabs.add("Results")
+        log_tab.grid_columnconfigure(0, weight=1); log_tab.grid_rowconfigure(0, weight=1)
+        self.log_area = customtkinter.CTkTextbox(log_tab, state="disabled", font=("Consolas", 12)); self.log_area.grid(row=0, column=0, sticky="nsew")
+
+        results_tab.grid_columnconfigure(0, weight=1); results_tab.grid_rowconfigure(1, weight=1)
+        filter_frame = customtkinter.CTkFrame(results_tab, fg_color="transparent"); filter_frame.grid(row=0, column=0, sticky="ew", pady=(0, 5)); filter_frame.grid_columnconfigure(2, weight=1)
+        self.result_status_menu = customtkinter.CTkOptionMenu(filter_frame, values=["All"] + [status.title() for status in STATUSES], width=110, command=lambda _: self._apply_result_filter())
+        self.result_status_menu.grid(row=0, column=0, padx=(0, 5))
+        self.result_ext_entry = customtkinter.CTkEntry(filter_frame, placeholder_text="Extension", width=90); self.result_ext_entry.grid(row=0, column=1, padx=(0, 5))
+        self.result_search_entry = customtkinter.CTkEntry(filter_frame, placeholder_text="Search paths..."); self.result_search_entry.grid(row=0, column=2, sticky="ew", padx=(0, 5))
+        for entry in (self.result_ext_entry, self.result_search_entry): entry.bind("<KeyRelease>", lambda event: self._schedule_result_filter())
+        self.result_count_label = customtkinter.CTkLabel(filter_frame, text="0 files", text_color="gray", font=customtkinter.CTkFont(size=11)); self.result_count_label.grid(row=0, column=3)
+        self.results_table = ResultsTable(results_tab, fg_color="transparent"); self.results_table.grid(row=1, column=0, sticky="nsew")
+        self.results_table.set_view(self.result_view)
 
         action_frame = customtkinter.CTkFrame(main_frame, fg_color="transparent"); action_frame.grid(row=3, column=0, sticky="ew", pady=(10, 0)); action_frame.grid_columnconfigure(1, weight=1)
-        self.progress_bar = customtkinter.CTkProgressBar(action_frame); self.progress_bar.set(0); self.progress_bar.grid(row=0, column=0, columnspan=4, sticky="ew", pady=(0, 10))
+        self.progress_bar = customtkinter.CTkProgressBar(action_frame); self.progress_bar.set(0); self.progress_bar.grid(row=0, column=0, columnspan=3, sticky="ew", pady=(0, 10))
+        self.progress_label = customtkinter.CTkLabel(action_frame, text="", text_color="gray", font=customtkinter.CTkFont(size=11)); self.progress_label.grid(row=0, column=3, sticky="e", padx=(10, 0), pady=(0, 10))
         op_button_frame = customtkinter.CTkFrame(action_frame, fg_color="transparent"); op_button_frame.grid(row=1, column=0, padx=(0,10), sticky="w")
         self.move_button = customtkinter.CTkButton(op_button_frame, text="Move", width=70, command=lambda: self.set_operation_mode("Move"), corner_radius=5); self.move_button.pack(side="left")
         self.copy_button = customtkinter.CTkButton(op_button_frame, text="Copy", width=70, command=lambda: self.set_operation_mode("Copy"), corner_radius=5); self.copy_button.pack(side="left", padx=(5,0))
         action_frame.grid_columnconfigure(1, weight=1)
+        self.watch_button = customtkinter.CTkButton(action_frame, text="Watch Folder", command=self.toggle_watch); self.watch_button.grid(row=1, column=1, sticky="e", padx=(0,10))
         self.dry_run_button = customtkinter.CTkButton(action_frame, text="Dry Run (Preview)", command=lambda: self.start_sorting_thread(dry_run=True)); self.dry_run_button.grid(row=1, column=2, padx=(0,10))
         self.sort_button = customtkinter.CTkButton(action_frame, text="Start Sorting", command=self.start_sorting_thread, font=customtkinter.CTkFont(size=14, weight="bold")); self.sort_button.grid(row=1, column=3, sticky="e")
         
         self.apply_settings_to_ui(self.settings)
+        startup_timer.mark("build_window")
+        # Idle callbacks run in order, so this one runs after the redraws queued while building the window.
+        self.after_idle(self._after_first_paint)
+
+    def _after_first_paint(self):
+        first_window_ms = startup_timer.elapsed_ms(); startup_timer.mark("first_paint")
+        self._load_logo(); startup_timer.mark("load_logo")
+        startup_timer.report(self.APP_VERSION, first_window_ms=first_window_ms)
+        self._check_interrupted_runs()
+        self._discard_plans()  # left by an earlier session; Start Sorting only ever runs this session's
+
+    def _check_interrupted_runs(self):
+        """Offers to resume, or else roll back, a Move run that did not finish (e.g. the app crashed)."""
+        states = journal.find_incomplete(JOURNAL_DIR)
+        if not states: return
+        state = states[0]
+        def ask_rollback():
+            CustomQuestionBox(self, title="Roll Back?",
+                              message="Move the files of the interrupted sort back to where they came from?\nChoose No to leave them where they are.",
+                              on_yes=lambda: self._rollback_run(state), on_no=lambda: journal.abandon(state))
+        CustomQuestionBox(self, title="Interrupted Sort", message=f"A sort did not finish:\n{state.describe()}\n\nResume it now?",
+                          on_yes=lambda: self._resume_run(state), on_no=lambda: self.after(0, ask_rollback))
+
+    def _load_logo(self):
+        try:
+            from PIL import Image
+            logo_image = customtkinter.CTkImage(
+                light_image=Image.open(resource_path("images/sorteo_logo_lightmode.png")),
+                dark_image=Image.open(resource_path("images/sorteo_logo_darkmode.png")),
+                size=(122, 32)
+            )
+            self.logo_label.configure(image=logo_image, text="")
+        except Exception as e:
+            print(f"Error loading logo: {e}")
 
     def _restart_app(self):
         """Restarts the current application by replacing the current process."""
@@ -236,6 +407,7 @@ class FileSorterApp(customtkinter.CTk):
         """Forces the window's title bar to be dark on Windows."""
         try:
             if sys.platform == "win32":
+                import ctypes
                 self.update()
                 hwnd = ctypes.windll.user32.GetParent(self.winfo_id())
                 DWMWA_USE_IMMERSIVE_DARK_MODE = 20
@@ -245,7 +417,7 @@ class FileSorterApp(customtkinter.CTk):
             pass
 
     def get_default_settings(self):
-        return {"theme": "System", "color_theme": "blue", "default_operation": "Move", "default_subfolders": True}
+        return {"theme": "System", "color_theme": "blue", "default_operation": "Move", "default_subfolders": True, "workers": 1, "copy_strategy": "copy", "dedup": "off", "date_source": "created", "verify": False, "bandwidth_limit": 0, "scan_workers": 1}
 
     def load_and_apply_settings(self):
         try:
@@ -257,10 +429,13 @@ class FileSorterApp(customtkinter.CTk):
         customtkinter.set_default_color_theme(color_theme)
 
     def apply_settings_to_ui(self, settings):
-        self.set_operation_mode(settings.get("default_operation", "Move"));
+        self.set_operation_mode(settings.get("default_operation", "Move")); self._update_rules_button()
         if settings.get("default_subfolders", True): self.recursive_sort.select()
         else: self.recursive_sort.deselect()
 
+    def _update_rules_button(self):
+        rule_count = len(self.settings.get("rules", [])); self.rules_button.configure(text=f"Rules ({rule_count})..." if rule_count else "Rules...")
+
     def save_settings(self, new_settings):
         with open(self.config_file, 'w') as f: json.dump(new_settings, f, indent=4)
         self.settings = new_settings
@@ -300,7 +475,7 @@ class FileSorterApp(customtkinter.CTk):
         repo_link = "https://github.com/madmalio/sorteo"
         link_label = customtkinter.CTkLabel(content_frame, text="View Source on GitHub", text_color="#6A8EDD", cursor="hand2")
         link_label.pack()
-        link_label.bind("<Button-1>", lambda e: webbrowser.open(repo_link))
+        link_label.bind("<Button-1>", lambda e: self._open_url(repo_link))
         
         # Spacer
         customtkinter.CTkLabel(content_frame, text="").pack(expand=True)
@@ -311,6 +486,10 @@ class FileSorterApp(customtkinter.CTk):
         customtkinter.CTkButton(button_frame, text="Check for Updates", command=self.check_for_updates).pack(side="left", padx=10)
         customtkinter.CTkButton(button_frame, text="Close", command=self.about_window.destroy).pack(side="left", padx=10)
 
+    def _open_url(self, url):
+        import webbrowser
+        webbrowser.open(url)
+
     def check_for_updates(self):
         threading.Thread(target=self._perform_update_check, daemon=True).start()
 
@@ -322,6 +501,7 @@ class FileSorterApp(customtkinter.CTk):
             return
             
         try:
+            import requests
             response = requests.get(GITHUB_VERSION_URL, timeout=5)
             response.raise_for_status()
             data = response.json()
@@ -338,7 +518,7 @@ class FileSorterApp(customtkinter.CTk):
                 self.after(0, lambda: CustomQuestionBox(self.about_window if self.about_window else self, 
                                                         title="Update Available", 
                                                         message=f"A new version (v{latest_version_str}) is available!\nWould you like to go to the download page?",
-                                                        on_yes=lambda: webbrowser.open(release_url)))
+                                                        on_yes=lambda: self._open_url(release_url)))
             else:
                 self.after(0, lambda: CustomMessageBox(self.about_window if self.about_window else self, title="Up to Date", message=f"You are running the latest version (v{self.APP_VERSION})."))
         except Exception as e:
@@ -347,7 +527,7 @@ class FileSorterApp(customtkinter.CTk):
     def open_settings_window(self):
         if self.settings_window and self.settings_window.winfo_exists(): self.settings_window.focus(); return
         self.settings_window = customtkinter.CTkToplevel(self)
-        self.settings_window.title("Settings"); self.settings_window.geometry("400x420"); self.settings_window.transient(self); self.settings_window.grab_set()
+        self.settings_window.title("Settings"); self.settings_window.geometry("400x860"); self.settings_window.transient(self); self.settings_window.grab_set()
         customtkinter.CTkLabel(self.settings_window, text="Appearance Theme", font=customtkinter.CTkFont(weight="bold")).pack(pady=(20, 5))
         theme_menu = customtkinter.CTkOptionMenu(self.settings_window, values=["System", "Light", "Dark"]); theme_menu.set(self.settings.get("theme", "System")); theme_menu.pack()
         customtkinter.CTkLabel(self.settings_window, text="Accent Color", font=customtkinter.CTkFont(weight="bold")).pack(pady=(20, 5))
@@ -383,6 +563,21 @@ class FileSorterApp(customtkinter.CTk):
         subfolders_check = customtkinter.CTkCheckBox(self.settings_window, text="Enable 'Include subfolders' by default")
         if self.settings.get("default_subfolders", True): subfolders_check.select()
         subfolders_check.pack(pady=(20,10))
+        customtkinter.CTkLabel(self.settings_window, text="Parallel Workers", font=customtkinter.CTkFont(weight="bold")).pack(pady=(10, 5))
+        workers_menu = customtkinter.CTkOptionMenu(self.settings_window, values=WORKER_CHOICES); workers_menu.set(str(self.settings.get("workers", 1))); workers_menu.pack()
+        customtkinter.CTkLabel(self.settings_window, text="Folder Scan Threads (network drives)", font=customtkinter.CTkFont(weight="bold")).pack(pady=(10, 5))
+        scan_workers_menu = customtkinter.CTkOptionMenu(self.settings_window, values=SCAN_WORKER_CHOICES); scan_workers_menu.set(str(self.settings.get("scan_workers", 1))); scan_workers_menu.pack()
+        customtkinter.CTkLabel(self.settings_window, text="Copy Method (same drive)", font=customtkinter.CTkFont(weight="bold")).pack(pady=(10, 5))
+        copy_strategy_menu = customtkinter.CTkOptionMenu(self.settings_window, values=COPY_STRATEGIES); copy_strategy_menu.set(self.settings.get("copy_strategy", "copy")); copy_strategy_menu.pack()
+        customtkinter.CTkLabel(self.settings_window, text="Duplicate Files", font=customtkinter.CTkFont(weight="bold")).pack(pady=(10, 5))
+        dedup_menu = customtkinter.CTkOptionMenu(self.settings_window, values=DEDUP_MODES); dedup_menu.set(self.settings.get("dedup", "off")); dedup_menu.pack()
+        customtkinter.CTkLabel(self.settings_window, text="File Date (created / modified / capture)", font=customtkinter.CTkFont(weight="bold")).pack(pady=(10, 5))
+        date_source_menu = customtkinter.CTkOptionMenu(self.settings_window, values=DATE_SOURCES); date_source_menu.set(self.settings.get("date_source", "created")); date_source_menu.pack()
+        customtkinter.CTkLabel(self.settings_window, text="Copy Speed Limit (MB/s)", font=customtkinter.CTkFont(weight="bold")).pack(pady=(10, 5))
+        bandwidth_menu = customtkinter.CTkOptionMenu(self.settings_window, values=BANDWIDTH_CHOICES); bandwidth_menu.set(str(self.settings.get("bandwidth_limit", 0) or BANDWIDTH_CHOICES[0])); bandwidth_menu.pack()
+        verify_check = customtkinter.CTkCheckBox(self.settings_window, text="Verify copies (checksum)")
+        if self.settings.get("verify", False): verify_check.select()
+        verify_check.pack(pady=(10, 0))
         button_frame = customtkinter.CTkFrame(self.settings_window, fg_color="transparent"); button_frame.pack(pady=(20, 10), fill="x", padx=20)
         
         def save_and_close():
@@ -404,8 +599,13 @@ class FileSorterApp(customtkinter.CTk):
 
             new_settings = {
                 "theme": new_theme, "color_theme": new_color_theme, 
-                "default_operation": new_operation_mode, "default_subfolders": new_subfolders
+                "default_operation": new_operation_mode, "default_subfolders": new_subfolders,
+                "workers": int(workers_menu.get()), "scan_workers": int(scan_workers_menu.get()), "copy_strategy": copy_strategy_menu.get(), "dedup": dedup_menu.get(),
+                "date_source": date_source_menu.get(), "verify": bool(verify_check.get()),
+                "bandwidth_limit": 0 if bandwidth_menu.get() == BANDWIDTH_CHOICES[0] else int(bandwidth_menu.get())
             }
+            for key in ("device_workers", "rules"): # edited elsewhere
+                if key in self.settings: new_settings[key] = self.settings[key]
             self.save_settings(new_settings)
 
             restart_needed = (new_color_theme != old_color_theme or
@@ -444,6 +644,10 @@ class FileSorterApp(customtkinter.CTk):
                 subfolders_check.select()
             else:
                 subfolders_check.deselect()
+            workers_menu.set(str(defaults["workers"])); scan_workers_menu.set(str(defaults["scan_workers"])); copy_strategy_menu.set(defaults["copy_strategy"]); dedup_menu.set(defaults["dedup"]); date_source_menu.set(defaults["date_source"])
+            bandwidth_menu.set(str(defaults["bandwidth_limit"] or BANDWIDTH_CHOICES[0]))
+            if defaults["verify"]: verify_check.select()
+            else: verify_check.deselect()
             update_settings_op_buttons()
             
         customtkinter.CTkButton(button_frame, text="Save & Close", command=save_and_close, font=customtkinter.CTkFont(weight="bold")).pack(side="right")
@@ -466,130 +670,279 @@ class FileSorterApp(customtkinter.CTk):
         customtkinter.CTkButton(button_frame, text="Clear All", command=lambda: [var.set("off") for var in self.checkbox_vars.values()]).pack(side="left", padx=5)
         customtkinter.CTkButton(button_frame, text="Apply", command=self.update_selected_file_types, font=customtkinter.CTkFont(weight="bold")).pack(side="left", padx=5)
 
+    def open_queue_window(self):
+        """Job queue: origin -> destination jobs taken from the main window's settings, run side by side across disks."""
+        if self.queue_window and self.queue_window.winfo_exists(): self.queue_window.focus(); return
+        self.queue_window = customtkinter.CTkToplevel(self)
+        self.queue_window.title("Job Queue"); self.queue_window.geometry("620x420"); self.queue_window.transient(self)
+        self.queue_list = customtkinter.CTkScrollableFrame(self.queue_window, label_text="Jobs"); self.queue_list.pack(expand=True, fill="both", padx=15, pady=(15, 0))
+        self.queue_list.grid_columnconfigure(0, weight=1)
+        button_frame = customtkinter.CTkFrame(self.queue_window, fg_color="transparent"); button_frame.pack(pady=15, fill="x", padx=15)
+        customtkinter.CTkButton(button_frame, text="Add Current Settings", command=self.add_current_job).pack(side="left")
+        customtkinter.CTkButton(button_frame, text="Clear Finished", command=self.clear_finished_jobs).pack(side="left", padx=5)
+        customtkinter.CTkLabel(button_frame, text="Jobs per disk").pack(side="left", padx=(10, 5))
+        per_device_menu = customtkinter.CTkOptionMenu(button_frame, values=JOBS_PER_DEVICE_CHOICES, width=60, command=lambda value: setattr(self, "jobs_per_device", value))
+        per_device_menu.set(self.jobs_per_device); per_device_menu.pack(side="left")
+        self.run_queue_button = customtkinter.CTkButton(button_frame, text="Run Queue", command=self.start_job_queue, font=customtkinter.CTkFont(weight="bold"))
+        self.run_queue_button.pack(side="right")
+        self.refresh_queue_window()
+
+    def refresh_queue_window(self):
+        self.queue_button.configure(text=f"Jobs ({sum(job.status == 'queued' for job in self.job_queue)})")
+        if not (self.queue_window and self.queue_window.winfo_exists()): return
+        for widget in self.queue_list.winfo_children(): widget.destroy()
+        for row, job in enumerate(self.job_queue):
+            opts = job.options
+            text = f"{job.name}\n{opts.operation} {', '.join(opts.file_types)} by {opts.structure_label}"
+            customtkinter.CTkLabel(self.queue_list, text=text, justify="left", anchor="w").grid(row=row, column=0, sticky="ew", pady=2)
+            status = job.status + (f" ({job.processed})" if job.status == "done" else "")
+            customtkinter.CTkLabel(self.queue_list, text=status, text_color="gray").grid(row=row, column=1, padx=10)
+            if job.status != "running":
+                customtkinter.CTkButton(self.queue_list, text="Remove", width=70, command=lambda j=job: self.remove_job(j)).grid(row=row, column=2)
+        if not self.job_queue:
+            customtkinter.CTkLabel(self.queue_list, text="Set up a sort in the main window, then Add Current Settings.", text_color="gray").grid(row=0, column=0, pady=10)
+        self.run_queue_button.configure(state="disabled" if self.sort_running else "normal")
+
+    def add_current_job(self):
+        options = self.collect_sort_options()
+        try: options.validate()
+        except SortError as e: CustomMessageBox(self, title="Error", message=str(e)); return
+        self.job_queue.append(Job(options)); self.refresh_queue_window()
+
+    def remove_job(self, job):
+        if job.status != "running": self.job_queue.remove(job); self.refresh_queue_window()
+
+    def clear_finished_jobs(self):
+        self.job_queue = [job for job in self.job_queue if job.status in ("queued", "running")]; self.refresh_queue_window()
+
+    def start_job_queue(self):
+        queued = [job for job in self.job_queue if job.status == "queued"]
+        if self.sort_running or not queued: return
+        self._discard_plans(); self.results = ResultStore(); self._apply_result_filter()
+        self.job_progress = {job: (0, 0) for job in queued}  # every key up front: job threads only replace values while another sums them
+        self.sort_engine = None; self._begin_run(); self.refresh_queue_window()
+
+        def make_engine(job, log):
+            return SortEngine(job.options, log=log, progress=lambda done, total: self._set_job_progress(job, done, total), results=self.results)
+        scheduler = JobScheduler(queued, per_device=int(self.jobs_per_device), log=self.log, make_engine=make_engine,
+                                 on_change=lambda job: self.after(0, self.refresh_queue_window))
+        threading.Thread(target=self._run_job_queue, args=(scheduler,), daemon=True).start()
+
+    def _set_job_progress(self, job, done, total):
+        self.job_progress[job] = (done, total)
+        done = sum(d for d, _ in self.job_progress.values()); total = sum(t for _, t in self.job_progress.values())
+        self._set_sort_progress(done, total)
+
+    def _run_job_queue(self, scheduler):
+        if self.log_pipeline.log_path: self.log(f"Full log: {os.path.abspath(self.log_pipeline.log_path)}")
+        try:
+            failed = scheduler.run()
+            self.log(f"\nJob queue complete! {len(scheduler.jobs) - failed} of {len(scheduler.jobs)} jobs succeeded.")
+        except Exception as e: self.log(f"ERROR: An unexpected error occurred: {e}"); self.after(0, lambda m=str(e): CustomMessageBox(self, title="Error", message=f"An unexpected error occurred:\n{m}"))
+        finally: self.log_pipeline.close(); self.after(0, self._finish_sorting); self.after(0, self.refresh_queue_window)
+
+    def open_rules_window(self):
+        """Routing rules, one per line, tried in order before the sorting structure; saved with the settings."""
+        if self.rules_window and self.rules_window.winfo_exists(): self.rules_window.focus(); return
+        self.rules_window = customtkinter.CTkToplevel(self)
+        self.rules_window.title("Routing Rules"); self.rules_window.geometry("560x420"); self.rules_window.transient(self); self.rules_window.grab_set()
+        help_text = ("One rule per line: conditions -> folder template. The first matching rule wins; other files use the Sorting Structure.\n"
+                     "Conditions: *.raw (type)   invoice_* (name)   >50MB  <1GB (size)   older:2y  newer:30d (age: h, d, w, m, y)")
+        customtkinter.CTkLabel(self.rules_window, text=help_text, wraplength=520, justify="left", text_color="gray").pack(padx=15, pady=(15, 5), anchor="w")
+        textbox = customtkinter.CTkTextbox(self.rules_window, font=("Consolas", 12)); textbox.pack(expand=True, fill="both", padx=15)
+        textbox.insert("1.0", "\n".join(self.settings.get("rules", [])) or "# *.raw >50MB -> RAW/{year}\n# invoice_* -> Finance/{year}/{month}\n# older:2y -> Cold")
+
+        def save_and_close():
+            rules = [line.strip() for line in textbox.get("1.0", "end").splitlines() if line.strip() and not line.lstrip().startswith("#")]
+            try: RuleRouter(rules, CompiledTemplate(""))
+            except TemplateError as e: CustomMessageBox(self.rules_window, title="Error", message=str(e)); return
+            new_settings = dict(self.settings); new_settings["rules"] = rules
+            self.save_settings(new_settings); self._update_rules_button(); self.rules_window.destroy()
+        button_frame = customtkinter.CTkFrame(self.rules_window, fg_color="transparent"); button_frame.pack(pady=15)
+        customtkinter.CTkButton(button_frame, text="Cancel", command=self.rules_window.destroy).pack(side="left", padx=5)
+        customtkinter.CTkButton(button_frame, text="Save", command=save_and_close, font=customtkinter.CTkFont(weight="bold")).pack(side="left", padx=5)
+
     def update_selected_file_types(self):
         selected = [ft for ft, var in self.checkbox_vars.items() if var.get() == "on"]; self.file_types_entry.delete(0, "end"); self.file_types_entry.insert(0, ", ".join(selected))
         if self.file_type_selector_window: self.file_type_selector_window.destroy(); self.file_type_selector_window = None
 
     def browse_origin(self): path = filedialog.askdirectory(); self.origin_entry.delete(0, "end"); self.origin_entry.insert(0, path)
     def browse_dest(self): path = filedialog.askdirectory(); self.dest_entry.delete(0, "end"); self.dest_entry.insert(0, path)
-    def log(self, message): self.log_area.configure(state="normal"); self.log_area.insert("end", message + "\n"); self.log_area.see("end"); self.log_area.configure(state="disabled"); self.update_idletasks()
+    def log(self, message): self.log_pipeline.put(message)
+
+    def _drain_log(self):
+        """Moves queued log lines into the log area in one insert and trims it to LOG_MAX_LINES."""
+        self._drain_job = None
+        lines = self.log_pipeline.drain(LOG_LINES_PER_FRAME)
+        if lines:
+            self.log_area.configure(state="normal"); self.log_area.insert("end", "\n".join(lines) + "\n")
+            excess = int(self.log_area.index("end-1c").split(".")[0]) - 1 - LOG_MAX_LINES
+            if excess > 0: self.log_area.delete("1.0", f"{excess + 1}.0")
+            self.log_area.see("end"); self.log_area.configure(state="disabled")
+        self._update_results()
+        self.progress_bar.set(self.sort_progress)
+        now = time.monotonic()
+        if self.sort_engine is not None and (now - self._progress_text_at >= PROGRESS_TEXT_S or not self.sort_running):
+            self.progress_label.configure(text=self.sort_engine.stats.progress_text()); self._progress_text_at = now
+        if self.sort_running or not self.log_pipeline.empty() or not self.result_view.complete: self._schedule_drain()
+
+    def _schedule_drain(self):
+        if self._drain_job is None: self._drain_job = self.after(LOG_POLL_MS, self._drain_log)
+
+    def _update_results(self):
+        """Brings the results view up to date with the store (a bounded number of rows per call) and redraws if it changed."""
+        if self.watch_stop is not None and len(self.results) >= WATCH_RESULT_ROWS:
+            self.results = self.sort_engine.results = ResultStore(); self._apply_result_filter()
+            self.log(f"Results table cleared after {WATCH_RESULT_ROWS:,} files; the log file keeps every line.")
+        grew = self.result_view.update(RESULT_ROWS_PER_FRAME)
+        if grew or len(self.results) != self._result_rows:
+            self._result_rows = len(self.results)
+            if grew: self.results_table.refresh()
+            shown = len(self.result_view)
+            self.result_count_label.configure(text=f"{shown:,} of {self._result_rows:,} files" if shown != self._result_rows else f"{shown:,} files")
+
+    def _schedule_result_filter(self):
+        if self._filter_job is not None: self.after_cancel(self._filter_job)
+        self._filter_job = self.after(RESULT_FILTER_DELAY_MS, self._apply_result_filter)
+
+    def _apply_result_filter(self):
+        """Replaces the results view with one for the current filter; it fills in over the next drains."""
+        self._filter_job = None
+        status = self.result_status_menu.get()
+        self.result_view = self.results.view(status=None if status == "All" else status.lower(),
+                                             extension=self.result_ext_entry.get().strip() or None, text=self.result_search_entry.get().strip() or None)
+        self._result_rows = -1; self.results_table.set_view(self.result_view); self._schedule_drain()
+
+    def _new_engine(self, options):
+        """Returns a SortEngine for ``options`` that records its files in a fresh results store."""
+        self.results = ResultStore(); self._apply_result_filter()
+        return SortEngine(options, log=self.log, progress=self._set_sort_progress, results=self.results)
+
+    def collect_sort_options(self):
+        """Reads the sort options from the widgets once, on the UI thread."""
+        return SortOptions(
+            origin=self.origin_entry.get(), dest=self.dest_entry.get(), file_types=self.file_types_entry.get(),
+            structure=self.sorting_structure_menu.get(), operation=self.operation_mode_var.get(),
+            recursive=bool(self.recursive_sort.get()), topic=self.topic_entry.get(), custom_pattern=self.custom_entry.get(),
+            workers=int(self.settings.get("workers", 1)), device_workers=self.settings.get("device_workers", {}),
+            copy_strategy=self.settings.get("copy_strategy", "copy"), incremental=bool(self.incremental_sort.get()),
+            dedup=self.settings.get("dedup", "off"), journal_dir=JOURNAL_DIR, date_source=self.settings.get("date_source", "created"),
+            rules=self.settings.get("rules", []), verify=self.settings.get("verify", False), bandwidth_limit=self.settings.get("bandwidth_limit", 0),
+            scan_workers=int(self.settings.get("scan_workers", 1)))
 
     def start_sorting_thread(self, dry_run=False):
-        origin = self.origin_entry.get(); dest = self.dest_entry.get(); types = self.file_types_entry.get()
-        if not all([origin, dest, types]): CustomMessageBox(self, title="Error", message="Please select origin, destination, and at least one file type."); return
-        if not os.path.isdir(origin): CustomMessageBox(self, title="Error", message="Origin folder does not exist."); return
-        
-        structure = self.sorting_structure_menu.get()
-        if ("Topic" in structure or ("Custom" in structure and "{topic}" in self.custom_entry.get())) and not self.topic_entry.get():
-            CustomMessageBox(self, title="Error", message="Please enter a Topic Name for this structure.")
-            return
-        if "Custom" in structure and not self.custom_entry.get():
-            CustomMessageBox(self, title="Error", message="Please enter a Custom Structure pattern.")
-            return
-
-        self.sort_button.configure(state="disabled"); self.dry_run_button.configure(state="disabled")
+        options = self.collect_sort_options()
+        try: options.validate()
+        except SortError as e: CustomMessageBox(self, title="Error", message=str(e)); return
+
+        run = {}
+        if dry_run:
+            run["save_plan"] = os.path.join(PLAN_DIR, f"plan-{datetime.now():%Y%m%d-%H%M%S}.jsonl")
+        elif self.last_plan and self.last_plan[1] == options.to_dict() and os.path.exists(self.last_plan[0]):
+            run["records"] = plan.read_records(self.last_plan[0])
+        self.last_plan = None
+        self.sort_engine = self._new_engine(options); self._begin_run()
+        threading.Thread(target=self.sort_files, args=(self.sort_engine, dry_run), kwargs=run, daemon=True).start()
+
+    def toggle_watch(self):
+        """Starts sorting new files as they arrive in the origin folder, or stops doing so."""
+        if self.watch_stop is not None:
+            self.watch_stop.set(); self.watch_button.configure(state="disabled", text="Stopping..."); return
+        options = self.collect_sort_options()
+        try: options.validate()
+        except SortError as e: CustomMessageBox(self, title="Error", message=str(e)); return
+        self._discard_plans(); self.watch_stop = threading.Event()
+        self.sort_engine = self._new_engine(options); self._begin_run()
+        self.watch_button.configure(state="normal", text="Stop Watching")
+        watcher = FolderWatcher.for_options(options, log=self.log)
+        threading.Thread(target=self._watch_files, args=(self.sort_engine, watcher, self.watch_stop), daemon=True).start()
+
+    def _watch_files(self, engine, watcher, stop):
+        if self.log_pipeline.log_path: self.log(f"Full log: {os.path.abspath(self.log_pipeline.log_path)}")
+        try: engine.watch(watcher, stop)
+        except Exception as e: self.log(f"ERROR: An unexpected error occurred: {e}"); self.after(0, lambda m=str(e): CustomMessageBox(self, title="Error", message=f"An unexpected error occurred:\n{m}"))
+        finally: self.log_pipeline.close(); self.after(0, self._finish_sorting)
+
+    def _begin_run(self):
+        """Locks the sort buttons, clears the log area and starts a fresh log file and progress display."""
+        self.sort_button.configure(state="disabled"); self.dry_run_button.configure(state="disabled"); self.watch_button.configure(state="disabled")
         self.log_area.configure(state="normal"); self.log_area.delete('1.0', "end"); self.log_area.configure(state="disabled")
-        self.progress_bar.set(0); threading.Thread(target=self.sort_files, args=(dry_run,), daemon=True).start()
-    
-    def get_file_list(self):
-        origin = self.origin_entry.get(); dest = self.dest_entry.get()
-        types = [ft.strip().lower() for ft in self.file_types_entry.get().split(',') if ft.strip()]; file_list = []
-        if self.recursive_sort.get():
-            for dirpath, _, filenames in os.walk(origin):
-                if dest and os.path.commonpath([dirpath, dest]) == dest: continue
-                for filename in filenames:
-                    if any(filename.lower().endswith(f".{ext}") for ext in types): file_list.append(os.path.join(dirpath, filename))
-        else:
-            for item in os.listdir(origin):
-                path = os.path.join(origin, item)
-                if os.path.isfile(path) and any(item.lower().endswith(f".{ext}") for ext in types): file_list.append(path)
-        return file_list
-
-    def process_file(self, source_path, dest_folder, dry_run=False):
-        filename = os.path.basename(source_path)
-        structure = self.sorting_structure_menu.get()
-        
-        if structure == "Custom...":
-            pattern = self.custom_entry.get()
-            sub_path = pattern
-            try:
-                dt = datetime.fromtimestamp(os.path.getctime(source_path))
-                sub_path = sub_path.replace("{year}", str(dt.year))
-                sub_path = sub_path.replace("{month}", dt.strftime('%b').upper())
-                sub_path = sub_path.replace("{day}", f"{dt.day:02d}")
-            except Exception as e:
-                self.log(f"Warning: Could not get date for {filename}: {e}.")
-
-            _, ext = os.path.splitext(filename)
-            file_type = ext[1:].lower() if ext else "other"
-            sub_path = sub_path.replace("{type}", file_type)
-
-            topic = self.topic_entry.get().strip()
-            sub_path = sub_path.replace("{topic}", topic)
-            
-            sub_path = sub_path.replace("\\", "/")
-            path_parts = [part for part in sub_path.split("/") if part]
-
-        else: # Handle predefined structures
-            path_parts = []
-            _, ext = os.path.splitext(filename)
-            file_ext = ext[1:].lower() if ext else "other"
-
-            if "Topic" in structure:
-                topic_name = self.topic_entry.get().strip()
-                if topic_name: path_parts.append(topic_name)
-            
-            if "File Type" in structure:
-                path_parts.append(file_ext)
-
-            if "Year" in structure or "Month" in structure or "Day" in structure:
-                try:
-                    ctime = os.path.getctime(source_path)
-                    dt = datetime.fromtimestamp(ctime)
-                    if "Year" in structure: path_parts.append(str(dt.year))
-                    if "Month" in structure: path_parts.append(dt.strftime('%b').upper())
-                    if "Day" in structure: path_parts.append(f"{dt.day:02d}")
-                except Exception as e: 
-                    self.log(f"Warning: Could not get date for {filename}: {e}.")
-        
-        target_base = os.path.join(dest_folder, *path_parts)
-        final_dest = os.path.join(target_base, filename)
-        
-        log_prefix = "[DRY RUN] " if dry_run else ""
-        op_verb = "Would copy" if self.operation_mode_var.get() == "Copy" else "Would move"
-        if not dry_run:
-            os.makedirs(target_base, exist_ok=True); counter = 1
-            while os.path.exists(final_dest):
-                name, ext = os.path.splitext(filename); final_dest = os.path.join(target_base, f"{name}_{counter}{ext}"); counter += 1
-            if self.operation_mode_var.get() == "Copy": shutil.copy2(source_path, final_dest); op_verb = "Copied"
-            else: shutil.move(source_path, final_dest); op_verb = "Moved"
-        self.log(f"{log_prefix}{op_verb}: {filename} -> {final_dest}")
-
-    def sort_files(self, dry_run=False):
-        dest = self.dest_entry.get(); moved = 0; mode = self.operation_mode_var.get()
-        self.log(f"--- Starting {'Dry Run' if dry_run else f'{mode} Operation'} ---")
-        self.log(f"Origin: {self.origin_entry.get()}")
-        self.log(f"Destination: {dest}")
-        self.log(f"File types: {self.file_types_entry.get()}")
-        
-        structure = self.sorting_structure_menu.get()
-        log_structure = self.custom_entry.get() if structure == "Custom..." else structure
-        self.log(f"Structure: {log_structure}")
-
-        self.log(f"Include subfolders: {'Yes' if self.recursive_sort.get() else 'No'}")
-        self.log("-" * 20)
+        prune_logs(LOG_DIR, LOG_KEEP - 1)
+        try: self.log_pipeline = LogPipeline(os.path.join(LOG_DIR, f"sorteo-{datetime.now():%Y%m%d-%H%M%S}.log"))
+        except OSError as e: self.log_pipeline = LogPipeline(); self.log(f"Warning: Could not create log file: {e}.")
+        self.sort_progress = 0; self.progress_bar.set(0); self.progress_label.configure(text=""); self.sort_running = True; self._schedule_drain()
+
+    def _resume_run(self, state):
+        try: options = SortOptions.from_dict(state.options); options.validate()
+        except (TypeError, SortError) as e: CustomMessageBox(self, title="Error", message=f"Cannot resume the interrupted sort:\n{e}"); return
+        self.sort_engine = self._new_engine(options); self._begin_run()
+        threading.Thread(target=self.sort_files, args=(self.sort_engine, False, lambda: journal.resume(state, self.log)), daemon=True).start()
+
+    def _rollback_run(self, state):
+        self.sort_engine = None; self._begin_run()
+        threading.Thread(target=self._rollback_files, args=(state,), daemon=True).start()
+
+    def _rollback_files(self, state):
+        if self.log_pipeline.log_path: self.log(f"Full log: {os.path.abspath(self.log_pipeline.log_path)}")
+        try: moved_back = journal.rollback(state, self.log); self.log(f"\nRoll back complete! Moved {moved_back} files back.")
+        except Exception as e: self.log(f"ERROR: An unexpected error occurred: {e}"); self.after(0, lambda m=str(e): CustomMessageBox(self, title="Error", message=f"An unexpected error occurred:\n{m}"))
+        finally: self.log_pipeline.close(); self.after(0, self._finish_sorting)
+
+    def undo_last_run(self):
+        """Offers to undo the newest run into the destination folder: moved files go back, copies are deleted."""
+        dest = self.dest_entry.get()
+        if self.sort_running: return
+        if not dest: CustomMessageBox(self, title="Undo", message="Please select the destination folder of the run to undo."); return
+        run = manifest.last_run(dest)
+        if run is None: CustomMessageBox(self, title="Undo", message=f"No run into {dest} to undo."); return
+        action = "move its files back to" if run.operation == "Move" else "delete its copies from"
+        CustomQuestionBox(self, title="Undo Last Run", message=f"Undo {run.describe()}?\n\nThis will {action} the destination. Files changed since the run are left alone.",
+                          on_yes=lambda: self._undo_run(dest, run.id))
+
+    def _undo_run(self, dest, run_id):
+        self.sort_engine = None; self._discard_plans(); self._begin_run()
+        threading.Thread(target=self._undo_files, args=(dest, run_id), daemon=True).start()
+
+    def _undo_files(self, dest, run_id):
+        if self.log_pipeline.log_path: self.log(f"Full log: {os.path.abspath(self.log_pipeline.log_path)}")
+        try:
+            counts = manifest.undo(dest, run_id, log=self.log)
+            left = sum(n for outcome, n in counts.items() if outcome not in ("restored", "deleted", "missing"))
+            self.log(f"\nUndo complete! Moved back {counts.get('restored', 0)} files, deleted {counts.get('deleted', 0)} copies"
+                     + (f", left {left} files in place (see the warnings above)." if left else "."))
+        except Exception as e: self.log(f"ERROR: An unexpected error occurred: {e}"); self.after(0, lambda m=str(e): CustomMessageBox(self, title="Error", message=f"An unexpected error occurred:\n{m}"))
+        finally: self.log_pipeline.close(); self.after(0, self._finish_sorting)
+
+    def _set_sort_progress(self, done, total): self.sort_progress = done / total if total else 1
+
+    def _finish_sorting(self):
+        self.sort_running = False
+        self.sort_button.configure(state="normal"); self.dry_run_button.configure(state="normal")
+        self.watch_button.configure(state="normal", text="Watch Folder"); self.watch_stop = None
+
+    def _discard_plans(self, keep=None):
+        """Deletes every saved plan but ``keep`` (a plan of a million files runs to hundreds of MB) and forgets the last one unless kept."""
+        self.last_plan = self.last_plan if keep is not None and self.last_plan and self.last_plan[0] == keep else None
+        try: names = os.listdir(PLAN_DIR)
+        except OSError: return
+        for name in names:
+            path = os.path.join(PLAN_DIR, name)
+            if name.startswith("plan-") and name.endswith(".jsonl") and path != keep:
+                try: os.remove(path)
+                except OSError: pass
+
+    def sort_files(self, engine, dry_run=False, before=None, save_plan=None, records=None):
+        if self.log_pipeline.log_path: self.log(f"Full log: {os.path.abspath(self.log_pipeline.log_path)}")
+        saved = None
         try:
-            files = self.get_file_list(); total = len(files)
-            if total == 0: self.log("No matching files found to process.")
-            for i, path in enumerate(files):
-                self.process_file(path, dest, dry_run); moved += 1
-                self.after(0, lambda p=(i + 1) / total: self.progress_bar.set(p))
-        except Exception as e: self.log(f"ERROR: An unexpected error occurred: {e}"); CustomMessageBox(self, title="Error", message=f"An unexpected error occurred:\n{e}")
-        finally:
-            self.log(f"\n{'Dry run complete!' if dry_run else 'Operation complete!'} Processed {moved} files.")
-            self.after(0, lambda: (self.sort_button.configure(state="normal"), self.dry_run_button.configure(state="normal")))
+            if before: before()
+            engine.sort_files(dry_run, save_plan=save_plan, records=records)
+            if save_plan: self.last_plan = (save_plan, engine.options.to_dict()); saved = save_plan
+        except Exception as e: self.log(f"ERROR: An unexpected error occurred: {e}"); self.after(0, lambda m=str(e): CustomMessageBox(self, title="Error", message=f"An unexpected error occurred:\n{m}"))
+        finally: self._discard_plans(keep=saved); self.log_pipeline.close(); self.after(0, self._finish_sorting)  # an executed or replaced plan is not needed again
 
 if __name__ == "__main__":
+    import multiprocessing
     multiprocessing.freeze_support()
     app = FileSorterApp()
     app.mainloop()
\ No newline at end of file
@@ -0,0 +1,11 @@
+"""Sorteo: sort files from an origin folder into a structured destination."""
+from .capture import DATE_SOURCES, CaptureDates
+from .copying import COPY_STRATEGIES, Copier
+from .dedup import DEDUP_MODES, Deduplicator
+from .destindex import DestinationIndex
+from .discovery import TypeMatcher, parallel_scan_files, scan_files
+from .engine import OPERATIONS, STRUCTURES, SortEngine, SortError, SortOptions, parse_file_types
+from .runindex import RunIndex
+from .stats import RunStats
+
+__version__ = "1.0.0"
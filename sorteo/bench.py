@@ -0,0 +1,126 @@
+"""Headless benchmark harness: ``python -m sorteo bench``.
+
+Builds synthetic origin trees in a temporary folder and times each stage of
+a sort separately (discovery, destination-path computation, copy/move), then
+prints the results as JSON so runs can be compared between versions.
+"""
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from . import __version__
+from .engine import SortEngine, SortOptions
+
+SHAPES = ["wide", "deep", "collisions", "mixed"]
+MATCH_TYPES = ["jpg", "png", "pdf", "docx", "mp4"]
+OTHER_TYPES = ["tmp", "log", "bak"]
+FILES_PER_DIR = 100
+DEEP_LEVELS = 40
+
+
+def _relative_paths(shape, count, rng):
+    """Yields the relative file paths for a synthetic tree of ``count`` files."""
+    for i in range(count):
+        if shape == "wide":
+            yield os.path.join(f"dir{i // FILES_PER_DIR:05d}", f"file{i:07d}.{MATCH_TYPES[i % len(MATCH_TYPES)]}")
+        elif shape == "deep":
+            depth = i % DEEP_LEVELS
+            parts = [f"d{level}" for level in range(depth)] + [f"b{i // (FILES_PER_DIR * DEEP_LEVELS):04d}"]
+            yield os.path.join(*parts, f"file{i:07d}.jpg")
+        elif shape == "collisions":
+            yield os.path.join(f"card{i // FILES_PER_DIR:05d}", f"IMG_{i % FILES_PER_DIR:04d}.jpg")
+        else: # mixed: a quarter of the files have extensions that are not sorted
+            ext = rng.choice(OTHER_TYPES) if rng.random() < 0.25 else rng.choice(MATCH_TYPES)
+            if rng.random() < 0.5: ext = ext.upper()
+            yield os.path.join(f"dir{rng.randrange(max(1, count // FILES_PER_DIR)):05d}", f"f{i:07d}.{ext}")
+
+
+def generate_tree(origin, shape, count, file_size=0, seed=0):
+    """Creates the synthetic tree; returns the number of files written."""
+    rng = random.Random(seed); payload = b"\0" * file_size; made = set(); written = 0
+    for rel in _relative_paths(shape, count, rng):
+        path = os.path.join(origin, rel); folder = os.path.dirname(path)
+        if folder not in made: os.makedirs(folder, exist_ok=True); made.add(folder)
+        with open(path, "wb") as f:
+            if payload: f.write(payload)
+        written += 1
+    return written
+
+
+def _stage(seconds, files, nbytes=None):
+    stage = {"seconds": round(seconds, 4), "files": files, "files_per_s": round(files / seconds, 1) if seconds > 0 else None}
+    if nbytes is not None: stage["mb_per_s"] = round(nbytes / seconds / 1e6, 2) if seconds > 0 else None
+    return stage
+
+
+def run_case(root, shape, count, structure="File Type/Year/Month", operation="Copy", workers=1, file_size=0, seed=0, scan_workers=1):
+    """Generates one tree under ``root`` and times each stage of sorting it."""
+    origin = os.path.join(root, "origin"); dest = os.path.join(root, "dest")
+    t = time.perf_counter(); generate_tree(origin, shape, count, file_size, seed); generate_s = time.perf_counter() - t
+
+    options = SortOptions(origin, dest, MATCH_TYPES, structure=structure, operation=operation, workers=workers, scan_workers=scan_workers)
+    engine = SortEngine(options)
+
+    t = time.perf_counter(); found = len(engine.get_file_list()); discovery_s = time.perf_counter() - t
+
+    entries = list(engine.scan_files())
+    t = time.perf_counter(); plan = [(e.path, engine.destination_dir(e.path, e), None) for e in entries]; planning_s = time.perf_counter() - t
+    del entries
+
+    t = time.perf_counter(); processed = engine.execute(plan); execute_s = time.perf_counter() - t
+
+    return {"shape": shape, "files": count, "matched": found, "structure": structure, "operation": operation,
+            "workers": workers, "scan_workers": scan_workers, "file_size": file_size, "generate_s": round(generate_s, 3),
+            "stages": {"discovery": _stage(discovery_s, found), "planning": _stage(planning_s, len(plan)),
+                       "execute": _stage(execute_s, processed, processed * file_size)},
+            "engine_stats": engine.stats.snapshot()}
+
+
+def run_benchmarks(shapes, counts, tmp_dir=None, keep=False, log=None, **case_options):
+    log = log or (lambda message: None)
+    results = []
+    for count in counts:
+        for shape in shapes:
+            root = tempfile.mkdtemp(prefix=f"sorteo-bench-{shape}-", dir=tmp_dir)
+            try:
+                log(f"{shape}: {count} files in {root}")
+                results.append(run_case(root, shape, count, **case_options))
+            finally:
+                if not keep: shutil.rmtree(root, ignore_errors=True)
+    return {"sorteo_version": __version__, "python": platform.python_version(), "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+
+
+def add_arguments(parser):
+    parser.add_argument("--shapes", default=",".join(SHAPES), help=f"comma-separated tree shapes ({', '.join(SHAPES)})")
+    parser.add_argument("--files", default="10000", help="comma-separated file counts, e.g. 10000,100000,1000000")
+    parser.add_argument("--file-size", type=int, default=0, help="bytes written to each synthetic file (default: 0)")
+    parser.add_argument("--structure", default="File Type/Year/Month")
+    parser.add_argument("--operation", choices=["Copy", "Move"], default="Copy")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--scan-workers", type=int, default=1, help="threads listing folders during discovery")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tmp-dir", help="where to build the trees (default: the system temp folder)")
+    parser.add_argument("--keep", action="store_true", help="keep the generated trees")
+    parser.add_argument("--output", help="write the JSON results here instead of stdout")
+
+
+def run_from_args(args):
+    shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+    unknown = [s for s in shapes if s not in SHAPES]
+    if unknown: print(f"Error: unknown shape(s): {', '.join(unknown)}", file=sys.stderr); return 2
+    counts = [int(c) for c in args.files.split(",") if c.strip()]
+    report = run_benchmarks(shapes, counts, tmp_dir=args.tmp_dir, keep=args.keep, log=lambda m: print(m, file=sys.stderr),
+                            structure=args.structure, operation=args.operation, workers=args.workers,
+                            file_size=args.file_size, seed=args.seed, scan_workers=args.scan_workers)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+    return 0
@@ -0,0 +1,191 @@
+"""Capture dates read from file headers, for date-based structures.
+
+``created`` keeps the old behaviour (st_ctime, which on Linux is the inode
+change time, so copies from a camera card all land in "today"), ``modified``
+uses st_mtime, and ``capture`` reads EXIF DateTimeOriginal from JPEG and
+TIFF-based raw files or the ``mvhd`` creation time from MP4/MOV, falling
+back to st_mtime. Only header bytes are read (the EXIF segment, or the box
+headers up to ``moov``), the reads run on a thread pool, and results are
+cached in DEST/.sorteo by (path, size, mtime) so re-runs do not parse the
+same files again.
+"""
+import os
+import struct
+import time
+from collections import deque
+
+from .state import StateCache
+
+DATE_SOURCES = ["created", "modified", "capture"]
+EXIF_TYPES = frozenset(["jpg", "jpeg", "jpe", "tif", "tiff", "dng", "cr2", "nef", "nrw", "arw", "orf", "rw2", "pef", "srw"])
+QUICKTIME_TYPES = frozenset(["mp4", "m4v", "mov", "3gp", "3g2"])
+TIFF_HEADER_BYTES = 256 * 1024  # raw files keep their EXIF IFD near the start
+QUICKTIME_EPOCH = 2082844800    # seconds from 1904-01-01 to 1970-01-01
+METADATA_CACHE_NAME = "metadata.sqlite"
+PREFETCH_PER_WORKER = 4
+
+_TAG_EXIF_IFD = 0x8769
+_TAG_DATETIME = 0x0132
+_TAG_DATETIME_ORIGINAL = 0x9003
+_TAG_DATETIME_DIGITIZED = 0x9004
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    taken REAL
+)
+"""
+
+
+def _extension(name):
+    dot = name.rfind(".")
+    return name[dot + 1:].lower() if dot > 0 else ""
+
+
+def has_capture_metadata(name):
+    ext = _extension(name)
+    return ext in EXIF_TYPES or ext in QUICKTIME_TYPES
+
+
+def _exif_time(text):
+    """'2024:03:07 14:05:09' (camera local time) -> timestamp, or None for blank/invalid values."""
+    try: return time.mktime(time.strptime(text.rstrip(b"\0 ").decode("ascii")[:19], "%Y:%m:%d %H:%M:%S"))
+    except (ValueError, OverflowError, UnicodeDecodeError): return None
+
+
+def tiff_capture_time(data):
+    """Parses a TIFF/EXIF block; returns DateTimeOriginal (or DateTimeDigitized, DateTime) as a timestamp."""
+    if len(data) < 8 or data[:2] not in (b"II", b"MM"): return None
+    order = "<" if data[:2] == b"II" else ">"
+    if struct.unpack_from(order + "H", data, 2)[0] != 42: return None
+
+    def ifd(offset):
+        tags = {}
+        if offset + 2 > len(data): return tags
+        count = struct.unpack_from(order + "H", data, offset)[0]
+        for n in range(count):
+            at = offset + 2 + 12 * n
+            if at + 12 > len(data): break
+            tag, kind, length, value = struct.unpack_from(order + "HHII", data, at)
+            if tag == _TAG_EXIF_IFD: tags[tag] = value
+            elif tag in (_TAG_DATETIME, _TAG_DATETIME_ORIGINAL, _TAG_DATETIME_DIGITIZED) and kind == 2 and length >= 19:
+                tags[tag] = data[value:value + length]
+        return tags
+
+    ifd0 = ifd(struct.unpack_from(order + "I", data, 4)[0])
+    exif = ifd(ifd0[_TAG_EXIF_IFD]) if _TAG_EXIF_IFD in ifd0 else {}
+    for tag, tags in ((_TAG_DATETIME_ORIGINAL, exif), (_TAG_DATETIME_DIGITIZED, exif), (_TAG_DATETIME, ifd0)):
+        if tag in tags:
+            taken = _exif_time(tags[tag])
+            if taken is not None: return taken
+    return None
+
+
+def jpeg_capture_time(f):
+    """Walks the JPEG marker segments up to the image data and parses the APP1 Exif segment."""
+    if f.read(2) != b"\xff\xd8": return None
+    while True:
+        header = f.read(4)
+        if len(header) < 4 or header[0] != 0xFF: return None
+        marker = header[1]; length = struct.unpack(">H", header[2:])[0]
+        if marker == 0xDA or marker == 0xD9: return None  # start of scan: no Exif before the image data
+        if marker == 0xE1:
+            segment = f.read(length - 2)
+            if segment[:6] == b"Exif\0\0": return tiff_capture_time(segment[6:])
+        else:
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def quicktime_capture_time(f):
+    """Finds moov/mvhd by reading box headers only; returns its creation time (UTC) as a timestamp."""
+    end = f.seek(0, os.SEEK_END); f.seek(0)
+    parents = [end]
+    while f.tell() + 8 <= parents[-1]:
+        start = f.tell()
+        size, kind = struct.unpack(">I4s", f.read(8))
+        if size == 1: size = struct.unpack(">Q", f.read(8))[0]
+        elif size == 0: size = parents[-1] - start
+        if size < 8: return None
+        if kind == b"moov":
+            parents.append(start + size); continue  # descend into the movie box
+        if kind == b"mvhd":
+            version = f.read(4)[0]
+            created = struct.unpack(">Q", f.read(8))[0] if version == 1 else struct.unpack(">I", f.read(4))[0]
+            return created - QUICKTIME_EPOCH if created > QUICKTIME_EPOCH else None
+        f.seek(start + size)
+    return None
+
+
+def read_capture_time(path):
+    """Returns the capture timestamp stored in ``path``'s header, or None if it has none.
+
+    Raises OSError when the file cannot be read, so that the failure is not cached.
+    """
+    ext = _extension(path)
+    with open(path, "rb") as f:
+        try:
+            if ext in QUICKTIME_TYPES: return quicktime_capture_time(f)
+            if ext in ("jpg", "jpeg", "jpe"): return jpeg_capture_time(f)
+            return tiff_capture_time(f.read(TIFF_HEADER_BYTES))
+        except (struct.error, IndexError, ValueError):
+            return None  # truncated or malformed header
+
+
+class MetadataCache(StateCache):
+    """(path, size, mtime) -> capture timestamp, in DEST/.sorteo/metadata.sqlite."""
+    def __init__(self, dest, read_only=False):
+        super().__init__(dest, METADATA_CACHE_NAME, _SCHEMA, "INSERT OR REPLACE INTO captures VALUES (?, ?, ?, ?)", read_only)
+
+    def get(self, path, st):
+        """Returns (found, taken); ``taken`` may be None for files known to have no capture date."""
+        with self._lock:
+            row = self._pending.get(path)
+            if row is not None: row = row[1:]
+            elif self._db is not None: row = self._db.execute("SELECT size, mtime_ns, taken FROM captures WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns: return False, None
+        return True, row[2]
+
+    def put(self, path, st, taken):
+        if self.read_only: return
+        with self._lock: self._add((path, st.st_size, st.st_mtime_ns, taken))
+
+
+class CaptureDates:
+    """Looks up capture dates for a stream of files on a thread pool, keeping their order."""
+    def __init__(self, dest, read_only=False, workers=None, stats=None):
+        self.cache = MetadataCache(dest, read_only)
+        self.workers = workers or min(32, (os.cpu_count() or 1) * 4)
+        self.stats = stats
+
+    def capture_time(self, path, st):
+        found, taken = self.cache.get(path, st)
+        if found: return taken
+        try: taken = read_capture_time(path)
+        except OSError: return None
+        if self.stats is not None: self.stats.add(metadata_reads=1)
+        self.cache.put(path, st, taken)
+        return taken
+
+    def with_capture_times(self, items):
+        """Turns (entry, stat) pairs into (entry, stat, capture timestamp or None), in the same order.
+
+        At most PREFETCH_PER_WORKER lookups per worker are in flight, so the
+        stream stays lazy and memory stays flat.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        window = deque(); limit = self.workers * PREFETCH_PER_WORKER
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="sorteo-metadata") as pool:
+            for entry, st in items:
+                future = pool.submit(self.capture_time, entry.path, st) if st is not None and has_capture_metadata(entry.name) else None
+                window.append((entry, st, future))
+                if len(window) >= limit:
+                    entry, st, future = window.popleft()
+                    yield entry, st, future.result() if future else None
+            while window:
+                entry, st, future = window.popleft()
+                yield entry, st, future.result() if future else None
+
+    def close(self):
+        self.cache.close()
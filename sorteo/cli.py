@@ -0,0 +1,268 @@
+"""Command line entry point: ``python -m sorteo sort --origin ... --dest ...``."""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+
+from . import __version__, bench, jobs, journal, manifest, plan, rules, watch
+from .capture import DATE_SOURCES
+from .copying import COPY_STRATEGIES
+from .dedup import DEDUP_MODES
+from .engine import OPERATIONS, STRUCTURES, SortEngine, SortError, SortOptions, parse_file_types
+from .templates import FIELD_HELP
+
+
+def add_sort_arguments(parser):
+    """Options shared by sort and watch: what to sort, where to, and how."""
+    parser.add_argument("--origin", required=True, help="folder containing the files to sort")
+    parser.add_argument("--dest", required=True, help="folder the sorted structure is created in")
+    parser.add_argument("--types", default="pdf, docx, xlsx, jpg, png, txt", help="comma-separated file extensions")
+    parser.add_argument("--structure", choices=STRUCTURES, help="folder structure (default: Year/Month, or Custom... when --pattern is given)")
+    parser.add_argument("--pattern", default="", help=f"custom structure, e.g. '{{topic}}/{{type}}/{{year}}-{{month}}'; fields: {FIELD_HELP}")
+    parser.add_argument("--topic", default="", help="topic name for Topic structures and {topic}")
+    parser.add_argument("--rule", action="append", default=[], metavar="RULE",
+                        help="routing rule tried before --structure, e.g. '*.raw >50MB -> RAW/{year}' (repeatable, first match wins)")
+    parser.add_argument("--rules-file", metavar="PATH", help="read routing rules from PATH, one per line (after any --rule)")
+    parser.add_argument("--operation", choices=OPERATIONS, default="Move")
+    parser.add_argument("--no-subfolders", dest="recursive", action="store_false", help="only sort the top level of the origin")
+    parser.add_argument("--workers", type=int, default=1, help="files copied/moved in parallel (default: 1)")
+    parser.add_argument("--scan-workers", type=int, default=1, metavar="N",
+                        help="list N folders at a time while looking for files; helps on SMB/NFS mounts (default: 1)")
+    parser.add_argument("--device-workers", action="append", default=[], metavar="PATH=N",
+                        help="use N workers when dest is on the same device as PATH (repeatable)")
+    parser.add_argument("--copy-strategy", choices=COPY_STRATEGIES, default="copy",
+                        help="Copy mode only: reflink or hardlink when origin and dest share a device, else a normal copy")
+    parser.add_argument("--verify", action="store_true",
+                        help="hash every copy while it is made and read it back before trusting it (and, for Move, deleting the source)")
+    parser.add_argument("--max-mbps", type=float, default=0, metavar="MB",
+                        help="cap copies at MB megabytes per second across all workers, e.g. for network shares (default: no cap)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="skip files an earlier run already sorted (index kept in DEST/.sorteo)")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="off",
+                        help="skip, or hardlink to, files whose content is already in the destination")
+    parser.add_argument("--date-source", choices=DATE_SOURCES, default="created",
+                        help="date for date-based structures: created (ctime), modified (mtime) or capture (EXIF/MP4, else mtime)")
+    parser.add_argument("--journal-dir", metavar="PATH", help="where Move runs keep their crash journal (default: DEST/.sorteo/journals)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="only print warnings and errors")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="sorteo", description="Sort files into structured folders.")
+    parser.add_argument("--version", action="version", version=f"Sorteo {__version__}")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sort = commands.add_parser("sort", help="sort an origin folder into a destination folder")
+    add_sort_arguments(sort)
+    sort.add_argument("--dry-run", action="store_true", help="show what would happen without touching any files")
+    sort.add_argument("--save-plan", metavar="PATH", help="dry run, saving every decision to PATH (JSON lines) for `sorteo plan run`")
+    sort.add_argument("--stats-json", metavar="PATH", help="write the run's counters and stage timings to PATH as JSON")
+
+    watcher = commands.add_parser("watch", help="keep sorting new files as they arrive in the origin, until interrupted")
+    add_sort_arguments(watcher)
+    watcher.add_argument("--settle", type=float, default=watch.SETTLE_SECONDS, metavar="SECONDS",
+                         help=f"how long a new file's size and mtime must stay the same before it is sorted (default: {watch.SETTLE_SECONDS:g})")
+    watcher.add_argument("--poll", type=float, default=watch.POLL_SECONDS, metavar="SECONDS",
+                         help=f"rescan interval when inotify is not used (default: {watch.POLL_SECONDS:g})")
+    watcher.add_argument("--no-inotify", dest="inotify", action="store_false", help="always poll instead of using inotify")
+    watcher.add_argument("--batch-size", type=int, default=watch.BATCH_SIZE, help=f"most files sorted per batch (default: {watch.BATCH_SIZE})")
+
+    jrn = commands.add_parser("journal", help="list, resume or roll back interrupted Move runs")
+    jrn.add_argument("action", choices=["list", "resume", "rollback", "abandon"])
+    where = jrn.add_mutually_exclusive_group(required=True)
+    where.add_argument("--dest", help="destination of the interrupted run (journals in DEST/.sorteo/journals)")
+    where.add_argument("--journal-dir", metavar="PATH", help="journal folder given to sort --journal-dir")
+    jrn.add_argument("--journal", metavar="FILE", help="which journal to act on (default: the oldest unfinished one)")
+    jrn.add_argument("-q", "--quiet", action="store_true", help="only print warnings and errors")
+
+    und = commands.add_parser("undo", help="undo the last run into a destination: move files back, delete copies")
+    und.add_argument("--dest", required=True, help="destination of the run to undo")
+    und.add_argument("--run", type=int, metavar="ID", help="undo this run instead of the last one (see --list)")
+    und.add_argument("--list", action="store_true", help="list the recorded runs and exit")
+    und.add_argument("--workers", type=int, default=manifest.UNDO_WORKERS, help=f"files undone in parallel (default: {manifest.UNDO_WORKERS})")
+    und.add_argument("-q", "--quiet", action="store_true", help="only print warnings and errors")
+
+    plans = commands.add_parser("plan", help="run or filter a plan saved by sort --save-plan").add_subparsers(dest="plan_command", required=True)
+    run = plans.add_parser("run", help="execute a saved plan without scanning the origin again")
+    run.add_argument("plan", help="plan file")
+    run.add_argument("--workers", type=int, help="override the plan's number of parallel workers")
+    run.add_argument("--stats-json", metavar="PATH", help="write the run's counters and stage timings to PATH as JSON")
+    run.add_argument("-q", "--quiet", action="store_true", help="only print warnings and errors")
+    flt = plans.add_parser("filter", help="write the records of a plan that match all given filters to a new plan")
+    flt.add_argument("plan", help="plan file")
+    flt.add_argument("-o", "--output", required=True, help="new plan file")
+    flt.add_argument("--op", action="append", choices=plan.PLAN_OPS, help="keep these operations (repeatable)")
+    flt.add_argument("--ext", help="keep these comma-separated extensions")
+    flt.add_argument("--include", action="append", metavar="GLOB", help="keep sources matching GLOB (repeatable)")
+    flt.add_argument("--exclude", action="append", metavar="GLOB", help="drop sources matching GLOB (repeatable)")
+
+    queue = commands.add_parser("jobs", help="run a list of origin -> destination jobs, in parallel across devices")
+    queue.add_argument("jobs", help='job file: {"sorteo_jobs": 1, "jobs": [{"origin": ..., "dest": ..., "file_types": ...}, ...]}')
+    queue.add_argument("--per-device", type=int, default=jobs.PER_DEVICE,
+                       help=f"jobs allowed to use the same disk at once (default: {jobs.PER_DEVICE})")
+    queue.add_argument("--dry-run", action="store_true", help="show what every job would do without touching any files")
+    queue.add_argument("-q", "--quiet", action="store_true", help="only print warnings and errors")
+
+    bench.add_arguments(commands.add_parser("bench", help="time discovery, planning and copy/move on synthetic trees"))
+    return parser
+
+
+def parse_device_workers(values):
+    device_workers = {}
+    for value in values:
+        path, sep, count = value.rpartition("=")
+        if not sep or not path or not count.isdigit(): raise SortError(f"Invalid --device-workers value: {value} (expected PATH=N)")
+        device_workers[path] = int(count)
+    return device_workers
+
+
+def options_from_args(args):
+    structure = args.structure or ("Custom..." if args.pattern else STRUCTURES[0])
+    try: file_rules = rules.read_rules(args.rules_file) if args.rules_file else []
+    except OSError as e: raise SortError(f"Cannot read rules: {e}")
+    return SortOptions(args.origin, args.dest, args.types, structure=structure, operation=args.operation,
+                       recursive=args.recursive, topic=args.topic, custom_pattern=args.pattern,
+                       workers=args.workers, device_workers=parse_device_workers(args.device_workers),
+                       copy_strategy=args.copy_strategy, incremental=args.incremental,
+                       dedup=args.dedup, journal_dir=args.journal_dir, date_source=args.date_source,
+                       rules=args.rule + file_rules, verify=args.verify, bandwidth_limit=args.max_mbps,
+                       scan_workers=args.scan_workers)
+
+
+def _logger(quiet):
+    def log(message):
+        if not quiet or message.startswith(("Warning", "ERROR")): sys.stdout.write(message + "\n") # one write, so worker threads never interleave
+    return log
+
+
+def run_sort(args, options=None, records=None):
+    try:
+        options = options or options_from_args(args)
+        options.validate()
+    except SortError as e:
+        print(f"Error: {e}", file=sys.stderr); return 2
+
+    save_plan = getattr(args, "save_plan", None)
+    dry_run = getattr(args, "dry_run", False) or bool(save_plan); stats_json = getattr(args, "stats_json", None)
+    engine = SortEngine(options, log=_logger(args.quiet))
+    status = 0
+    try:
+        engine.sort_files(dry_run=dry_run, save_plan=save_plan, records=records)
+    except Exception as e:
+        print(f"ERROR: An unexpected error occurred: {e}", file=sys.stderr); status = 1
+    if stats_json: write_stats(stats_json, engine, dry_run, status)
+    return status
+
+
+def run_watch(args):
+    try:
+        options = options_from_args(args)
+        options.validate()
+        if args.batch_size < 1: raise SortError("The batch size must be at least 1.")
+        if args.settle < 0 or args.poll < 0: raise SortError("--settle and --poll cannot be negative.")
+    except SortError as e:
+        print(f"Error: {e}", file=sys.stderr); return 2
+
+    log = _logger(args.quiet); stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM): signal.signal(sig, lambda *_: stop.set())
+    watcher = watch.FolderWatcher.for_options(options, settle_seconds=args.settle, poll_seconds=args.poll,
+                                              batch_size=args.batch_size, use_inotify=args.inotify, log=log)
+    try:
+        SortEngine(options, log=log).watch(watcher, stop)
+    except Exception as e:
+        print(f"ERROR: An unexpected error occurred: {e}", file=sys.stderr); return 1
+    return 0
+
+
+def run_journal(args):
+    journal_dir = args.journal_dir or journal.default_journal_dir(args.dest)
+    states = journal.find_incomplete(journal_dir)
+    if args.action == "list":
+        for state in states: print(f"{state.path}: {state.describe()}")
+        if not states: print(f"No interrupted runs in {journal_dir}.")
+        return 0
+    if args.journal: states = [s for s in states if os.path.abspath(s.path) == os.path.abspath(args.journal)]
+    if not states:
+        print(f"Error: No interrupted run to {args.action} in {journal_dir}.", file=sys.stderr); return 2
+    state = states[0]; log = _logger(args.quiet)
+    log(f"Journal: {state.path} ({state.describe()})")
+    if args.action == "abandon":
+        journal.abandon(state); log("Marked as abandoned; no files were touched."); return 0
+    if args.action == "rollback":
+        moved_back = journal.rollback(state, log)
+        log(f"\nRoll back complete! Moved {moved_back} files back."); return 0
+    try: options = SortOptions.from_dict(state.options)
+    except TypeError as e:
+        print(f"Error: The journal's options cannot be read: {e}", file=sys.stderr); return 2
+    journal.resume(state, log)
+    return run_sort(args, options)
+
+
+def run_undo(args):
+    if args.list:
+        runs = manifest.list_runs(args.dest)
+        for run in runs: print(run.describe())
+        if not runs: print(f"No recorded runs in {args.dest}.")
+        return 0
+    log = _logger(args.quiet)
+    try:
+        counts = manifest.undo(args.dest, args.run, workers=args.workers, log=log)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr); return 2
+    left = sum(n for outcome, n in counts.items() if outcome not in ("restored", "deleted", "missing"))
+    log(f"\nUndo complete! Moved back {counts.get('restored', 0)} files, deleted {counts.get('deleted', 0)} copies"
+        + (f", left {left} files in place (see the warnings above)." if left else "."))
+    return 1 if left else 0
+
+
+def run_plan(args):
+    try:
+        header = plan.read_header(args.plan)
+        if args.plan_command == "filter":
+            exts = parse_file_types(args.ext) if args.ext else None
+            records = plan.filter_plan(plan.read_records(args.plan), args.op, exts, args.include, args.exclude)
+            print(f"Wrote {plan.write_plan(args.output, header, records)} records to {args.output}."); return 0
+        options = SortOptions.from_dict(header["options"])
+        if args.workers: options.workers = args.workers; options.device_workers = {}
+        return run_sort(args, options, plan.read_records(args.plan))
+    except (OSError, TypeError, plan.PlanError) as e:
+        print(f"Error: {e}", file=sys.stderr); return 2
+
+
+def run_jobs(args):
+    try:
+        queued = jobs.read_jobs(args.jobs)
+        scheduler = jobs.JobScheduler(queued, per_device=args.per_device, log=_logger(args.quiet))
+    except (OSError, jobs.JobError, SortError) as e:
+        print(f"Error: {e}", file=sys.stderr); return 2
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM): signal.signal(sig, lambda *_: stop.set())
+    failed = scheduler.run(args.dry_run, stop)
+    print("\n" + "\n".join(f"{job.name}: {job.status}" + (f" ({job.processed} files)" if job.status == "done" else f" ({job.error})" if job.error else "")
+                            for job in queued))
+    return 1 if failed else 0
+
+
+def write_stats(path, engine, dry_run, status):
+    opts = engine.options
+    record = {"origin": opts.origin, "dest": opts.dest, "operation": "Dry Run" if dry_run else opts.operation,
+              "structure": opts.structure_label, "workers": opts.workers_for_dest(), "status": status,
+              "stats": engine.stats.snapshot()}
+    try:
+        with open(path, "w", encoding="utf-8") as f: json.dump(record, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Could not write stats to {path}: {e}", file=sys.stderr)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "sort": return run_sort(args)
+    if args.command == "watch": return run_watch(args)
+    if args.command == "journal": return run_journal(args)
+    if args.command == "plan": return run_plan(args)
+    if args.command == "jobs": return run_jobs(args)
+    if args.command == "undo": return run_undo(args)
+    if args.command == "bench": return bench.run_from_args(args)
+    return 2
@@ -0,0 +1,189 @@
+"""Copy strategies for Copy mode.
+
+``copy`` is plain shutil.copy2 (which already uses os.sendfile on Linux, so
+cross-device copies never go through Python buffers). The opt-in strategies
+take a shortcut when source and destination folders are on the same device:
+
+* ``reflink``: clone the file with the FICLONE ioctl (btrfs, XFS, ...) or
+  let the kernel copy it with copy_file_range, so no data passes through
+  user space and CoW filesystems share the extents.
+* ``hardlink``: add a second name for the same inode. Instant, but both
+  names then refer to the same data, so editing one edits the other.
+
+Whenever a shortcut is not possible the copier falls back to shutil.copy2,
+or to streaming; copy_file_range is only used when neither a bandwidth cap
+nor verification is set.
+
+Files of STREAM_MIN_SIZE and up, and every file when a bandwidth cap or
+verification is set, are streamed instead: chunk by chunk with os.sendfile,
+or through a reusable per-thread buffer when the data has to be hashed, so
+a 40 GB video reports its progress as it goes. With ``verify`` the source
+is hashed as it is copied (no second read of the source) and the copy is
+read back and compared before the source may be deleted by a Move.
+"""
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+
+from .dedup import full_hash, full_hasher
+
+COPY_STRATEGIES = ["copy", "reflink", "hardlink"]
+COPY_CHUNK = 8 << 20          # bytes per sendfile call / buffer fill: the granularity of progress and throttling
+STREAM_MIN_SIZE = 64 << 20    # smaller files are copied in one go when neither a cap nor verification is set
+
+FICLONE = 0x40049409  # _IOW(0x94, 9, int) from linux/fs.h
+_UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EBADF, errno.EPERM}
+
+
+def _ficlone(src_fd, dst_fd):
+    import fcntl
+    fcntl.ioctl(dst_fd, FICLONE, src_fd)
+
+
+def _copy_file_range(src_fd, dst_fd, size):
+    copied = 0
+    while copied < size:
+        n = os.copy_file_range(src_fd, dst_fd, size - copied)
+        if n == 0: break
+        copied += n
+    if copied < size: raise OSError(errno.EIO, "copy_file_range stopped early")
+
+
+class VerifyError(OSError):
+    """Raised when a copy does not read back the same as its source."""
+
+
+class BandwidthLimiter:
+    """Token bucket shared by every worker: ``rate`` bytes per second, in bursts of at most one second's worth."""
+    def __init__(self, rate):
+        self.rate = rate
+        self._lock = threading.Lock()
+        self._allowance = rate; self._last = time.monotonic()
+
+    def consume(self, nbytes):
+        with self._lock:
+            now = time.monotonic()
+            self._allowance = min(self.rate, self._allowance + (now - self._last) * self.rate) - nbytes; self._last = now
+            wait = -self._allowance / self.rate if self._allowance < 0 else 0
+        if wait > 0: time.sleep(wait)
+
+
+class Copier:
+    """Copies files with one strategy for a whole run.
+
+    Device numbers are looked up once per folder, and a kernel fast path that
+    fails as unsupported is switched off for that destination device, so a
+    filesystem without reflinks costs one failed syscall per run, not per file.
+    ``bandwidth`` caps streamed copies to that many bytes per second (0: no
+    cap), ``verify`` checks every streamed copy against its source, and
+    ``on_bytes(dest_path, done, size)`` is called after every chunk.
+    """
+    def __init__(self, strategy="copy", verify=False, bandwidth=0, on_bytes=None):
+        if strategy not in COPY_STRATEGIES: raise ValueError(f"Unknown copy strategy: {strategy}")
+        self.strategy = strategy
+        self.verify = verify
+        self.limiter = BandwidthLimiter(bandwidth) if bandwidth else None
+        self.on_bytes = on_bytes
+        self._lock = threading.Lock()
+        self._devices = {}
+        self._no_clone = set(); self._no_range = set()
+        self._linux = sys.platform.startswith("linux")
+        self._sendfile = hasattr(os, "sendfile") and self._linux  # file-to-file sendfile is Linux-only
+        self._buffers = threading.local()
+
+    def device(self, folder):
+        dev = self._devices.get(folder)
+        if dev is None: dev = self._devices[folder] = os.stat(folder).st_dev
+        return dev
+
+    def same_device(self, source_path, dest_path):
+        try: return self.device(os.path.dirname(source_path)) == self.device(os.path.dirname(dest_path))
+        except OSError: return False
+
+    def copy(self, source_path, dest_path, size=None):
+        """Copies one file; returns the method used ('copy', 'reflink', 'copy_file_range' or 'hardlink')."""
+        if self.strategy != "copy" and self.same_device(source_path, dest_path):
+            dev = self.device(os.path.dirname(dest_path))
+            if self.strategy == "hardlink":
+                try:
+                    os.link(source_path, dest_path); return "hardlink"
+                except OSError:
+                    pass
+            elif self._linux:
+                method = self._kernel_copy(source_path, dest_path, dev)
+                if method: return method
+        self.copy_file(source_path, dest_path, size)
+        return "copy"
+
+    def copy_file(self, source_path, dest_path, size=None):
+        """shutil.copy2 replacement (also used by Move across devices); streams the file when needed."""
+        if not (self.verify or self.limiter):
+            if size is None: size = os.stat(source_path).st_size
+            if size < STREAM_MIN_SIZE: return shutil.copy2(source_path, dest_path)
+        self._stream(source_path, dest_path)
+        shutil.copystat(source_path, dest_path)
+        return dest_path
+
+    def _buffer(self):
+        buf = getattr(self._buffers, "buf", None)
+        if buf is None: buf = self._buffers.buf = bytearray(COPY_CHUNK)
+        return buf
+
+    def _chunk_done(self, dest_path, done, size, nbytes):
+        if self.limiter is not None: self.limiter.consume(nbytes)
+        if self.on_bytes is not None: self.on_bytes(dest_path, done, size)
+
+    def _stream(self, source_path, dest_path):
+        hasher = full_hasher() if self.verify else None
+        with open(source_path, "rb", buffering=0) as fsrc, open(dest_path, "wb", buffering=0) as fdst:
+            size = os.fstat(fsrc.fileno()).st_size; done = 0
+            if hasher is None and self._sendfile:
+                try:
+                    while True:
+                        n = os.sendfile(fdst.fileno(), fsrc.fileno(), done, COPY_CHUNK)
+                        if not n: break
+                        done += n; self._chunk_done(dest_path, done, size, n)
+                except OSError as e:
+                    if done or e.errno not in _UNSUPPORTED: raise
+            if done == 0 or hasher is not None:
+                buf = self._buffer(); view = memoryview(buf)
+                fsrc.seek(done)
+                while True:
+                    n = fsrc.readinto(buf)
+                    if not n: break
+                    if hasher is not None: hasher.update(view[:n])
+                    written = 0
+                    while written < n: written += fdst.write(view[written:n])
+                    done += n; self._chunk_done(dest_path, done, size, n)
+        if hasher is not None and full_hash(dest_path) != hasher.digest():
+            os.remove(dest_path)
+            raise VerifyError(errno.EIO, f"Copy does not match its source (removed): {dest_path}")
+
+    def _kernel_copy(self, source_path, dest_path, dev):
+        try_clone = dev not in self._no_clone
+        # copy_file_range is a full byte copy that the cap, verification and byte progress never see: stream those instead
+        try_range = dev not in self._no_range and hasattr(os, "copy_file_range") and not (self.verify or self.limiter)
+        if not (try_clone or try_range): return None
+        with open(source_path, "rb") as fsrc, open(dest_path, "wb") as fdst:
+            if try_clone:
+                try:
+                    _ficlone(fsrc.fileno(), fdst.fileno()); method = "reflink"
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED: raise
+                    with self._lock: self._no_clone.add(dev)
+                    method = None
+            else:
+                method = None
+            if method is None and try_range:
+                try:
+                    _copy_file_range(fsrc.fileno(), fdst.fileno(), os.fstat(fsrc.fileno()).st_size); method = "copy_file_range"
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED: raise
+                    with self._lock: self._no_range.add(dev)
+                    fdst.seek(0); fdst.truncate()
+        if method is None: return None  # dest_path is empty; shutil.copy2 overwrites it
+        shutil.copystat(source_path, dest_path)
+        return method
@@ -0,0 +1,187 @@
+"""Content-hash deduplication against the destination folder.
+
+A file is only hashed when the destination already holds a file of the same
+size. Candidates are then compared by a quick hash of the first and last
+EDGE_BYTES, and only when those match by a hash of the whole file. Hashes are
+cached in DEST/.sorteo by (path, size, mtime) so later runs do not re-read
+files. Whole-file hashes of large files run in a process pool, all the
+candidates of a file at once; small files are hashed in-process.
+"""
+import hashlib
+import os
+import threading
+
+from .state import STATE_DIR, StateCache
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+DEDUP_MODES = ["off", "skip", "hardlink"]
+EDGE_BYTES = 64 * 1024
+HASH_CACHE_NAME = "hashes.sqlite"
+FULL_HASH_ALGO = "xxh3_128" if xxhash else "blake2b"
+SIZE_LOCKS = 64
+INLINE_HASH_BYTES = 4 << 20  # smaller files hash faster here than the pool can pickle and ship the job
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    quick BLOB,
+    full BLOB,
+    algo TEXT
+)
+"""
+
+
+def quick_hash(path, size):
+    """BLAKE2b of the first and last EDGE_BYTES (of the whole file when it is smaller)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if size <= 2 * EDGE_BYTES:
+            h.update(f.read())
+        else:
+            h.update(f.read(EDGE_BYTES)); f.seek(-EDGE_BYTES, os.SEEK_END); h.update(f.read(EDGE_BYTES))
+    return h.digest()
+
+
+def full_hasher():
+    """A new FULL_HASH_ALGO hash object."""
+    return xxhash.xxh3_128() if xxhash else hashlib.blake2b(digest_size=32)
+
+
+def full_hash(path):
+    """xxh3-128 of the whole file when xxhash is installed, else BLAKE2b."""
+    h = full_hasher()
+    buf = bytearray(1 << 20); view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n: break
+            h.update(view[:n])
+    return h.digest()
+
+
+class HashCache(StateCache):
+    """(path, size, mtime) -> (quick, full) hashes, in memory and in DEST/.sorteo/hashes.sqlite."""
+    def __init__(self, dest, read_only=False):
+        super().__init__(dest, HASH_CACHE_NAME, _SCHEMA, "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)", read_only)
+        self._memo = {}
+
+    def get(self, path, st):
+        with self._lock:
+            row = self._memo.get(path)
+            if row is None and self._db is not None:
+                row = self._db.execute("SELECT size, mtime_ns, quick, full, algo FROM hashes WHERE path = ?", (path,)).fetchone()
+                if row is not None:
+                    if row[4] != FULL_HASH_ALGO: row = row[:3] + (None, FULL_HASH_ALGO)
+                    self._memo[path] = row
+        if row is None or row[0] != st.st_size or row[1] != st.st_mtime_ns: return None, None
+        return row[2], row[3]
+
+    def put(self, path, st, quick, full):
+        row = (st.st_size, st.st_mtime_ns, quick, full, FULL_HASH_ALGO)
+        with self._lock:
+            self._memo[path] = row
+            if self._db is None or self.read_only: return
+            self._add((path,) + row)
+
+
+class Deduplicator:
+    """Finds files in the destination that are byte-identical to a source file.
+
+    The destination is listed once up front into a size -> paths map, and
+    files placed during the run are added to it. Callers hold
+    ``lock_for(size)`` around find + place + register, so two identical
+    files processed by different workers cannot both be stored.
+    """
+    def __init__(self, dest, mode, read_only=False, workers=None):
+        self.mode = mode
+        self.cache = HashCache(dest, read_only)
+        self.workers = workers or os.cpu_count() or 1
+        self._lock = threading.Lock()
+        self._size_locks = [threading.Lock() for _ in range(SIZE_LOCKS)]
+        self._pool = None
+        self._by_size = {}
+        self._planned = {}  # planned destination -> source, in dry runs
+        self._scan(dest)
+
+    def _scan(self, dest):
+        stack = [dest]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name != STATE_DIR: stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            self.register(entry.path, entry.stat().st_size)
+                    except OSError:
+                        pass
+
+    def lock_for(self, size):
+        return self._size_locks[size % SIZE_LOCKS]
+
+    def register(self, path, size, source=None):
+        """Adds ``path`` to the candidates; ``source`` is the file that will be there, for paths a dry run only plans."""
+        if not size: return
+        self._by_size.setdefault(size, []).append(path)
+        if source is not None: self._planned[path] = source
+
+    def _get_pool(self):
+        with self._lock:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                try: self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                except (OSError, NotImplementedError): self._pool = False
+        return self._pool
+
+    def _quick(self, path, st):
+        quick, full = self.cache.get(path, st)
+        if quick is None: quick = quick_hash(path, st.st_size); self.cache.put(path, st, quick, full)
+        return quick
+
+    def _full(self, files):
+        """Full hashes of ``files`` [(path, stat)], in order.
+
+        Files over INLINE_HASH_BYTES that are not cached are all submitted
+        to the pool before any result is awaited, so they hash side by side;
+        smaller ones are hashed here meanwhile.
+        """
+        hashes = [self.cache.get(path, st)[1] for path, st in files]
+        large = [i for i, (path, st) in enumerate(files) if hashes[i] is None and st.st_size > INLINE_HASH_BYTES]
+        pool = self._get_pool() if large else None
+        futures = {i: pool.submit(full_hash, files[i][0]) for i in large} if pool else {}
+        for i, (path, st) in enumerate(files):
+            if hashes[i] is None and i not in futures: hashes[i] = full_hash(path)
+        for i, future in futures.items(): hashes[i] = future.result()
+        for (path, st), full in zip(files, hashes): self.cache.put(path, st, self._quick(path, st), full)
+        return hashes
+
+    def find_duplicate(self, source_path, st):
+        """Returns a destination path with the same content as ``source_path``, or None."""
+        candidates = self._by_size.get(st.st_size)
+        if not candidates: return None
+        quick = self._quick(source_path, st)
+        matches = []  # (candidate, file to read, stat); a dry run reads the source planned for a candidate
+        for candidate in list(candidates):
+            path = self._planned.get(candidate, candidate)
+            try: cst = os.stat(path)
+            except OSError: continue
+            if cst.st_size == st.st_size and self._quick(path, cst) == quick: matches.append((candidate, path, cst))
+        if not matches: return None
+        if st.st_size <= 2 * EDGE_BYTES: return matches[0][0]  # the quick hash covered the whole file
+        full = self._full([(source_path, st)] + [(path, cst) for _, path, cst in matches])
+        return next((candidate for (candidate, _, _), h in zip(matches, full[1:]) if h == full[0]), None)
+
+    def close(self):
+        if self._pool: self._pool.shutdown()
+        self._pool = None
+        self.cache.close()
@@ -0,0 +1,73 @@
+"""Per-run cache of destination folders and the file names inside them."""
+import os
+import threading
+
+
+class _Folder:
+    __slots__ = ("names", "next_suffix")
+
+    def __init__(self, names):
+        self.names = names          # casefolded names present or claimed in this folder
+        self.next_suffix = {}       # casefolded original name -> next _N to try
+
+
+class DestinationIndex:
+    """Chooses collision-free destination names without a stat per attempt.
+
+    Each folder is created (when ``create`` is set) and listed with one
+    scandir the first time a run touches it; after that, picking a name is a
+    set lookup and the next ``_N`` suffix for a repeated name is remembered,
+    so thousands of IMG_0001.jpg landing in one folder stay O(1) each. The
+    chosen name still gets a single os.path.exists check in case another
+    program created it after the folder was listed. Names are compared
+    casefolded on every platform: the destination may be a case-insensitive
+    filesystem (APFS, exFAT, SMB) even on Linux, and names are often claimed
+    before any file is written, so IMG_0001.JPG and img_0001.jpg must not
+    both be handed out. Safe to share between worker threads.
+    """
+    def __init__(self, stats=None, on_create=None):
+        self.stats = stats  # optional RunStats that gets makedirs/scan/stat/retry counts
+        self.on_create = on_create  # optional callback given the folders a claim had to create
+        self._lock = threading.Lock()
+        self._folders = {}
+
+    def _folder(self, folder, create):
+        entry = self._folders.get(folder)
+        if entry is None:
+            if create: self._makedirs(folder)
+            if self.stats is not None: self.stats.add(makedirs_calls=int(create), dir_scans=1)
+            try:
+                with os.scandir(folder) as it: names = {e.name.casefold() for e in it}
+            except FileNotFoundError:
+                names = set()
+            entry = self._folders[folder] = _Folder(names)
+        return entry
+
+    def _makedirs(self, folder):
+        if self.on_create is None: os.makedirs(folder, exist_ok=True); return
+        missing = []; parent = folder
+        while not os.path.isdir(parent):
+            missing.append(parent); above = os.path.dirname(parent)
+            if above == parent: break
+            parent = above
+        os.makedirs(folder, exist_ok=True)
+        if missing: self.on_create(missing)
+
+    def claim(self, folder, filename, create=True):
+        """Reserves and returns a free path for ``filename`` in ``folder``.
+
+        Pass ``create=False`` (dry runs) to plan names without creating folders.
+        """
+        with self._lock:
+            entry = self._folder(folder, create)
+            key = filename.casefold(); name, ext = os.path.splitext(filename)
+            candidate = filename; counter = entry.next_suffix.get(key, 1); checks = retries = 0
+            while True:
+                cand_key = candidate.casefold()
+                if cand_key not in entry.names:
+                    entry.names.add(cand_key); final_dest = os.path.join(folder, candidate); checks += 1
+                    if not os.path.exists(final_dest): break
+                candidate = f"{name}_{counter}{ext}"; counter += 1; retries += 1
+            if candidate != filename: entry.next_suffix[key] = counter
+        if self.stats is not None: self.stats.add(stat_calls=checks, collision_retries=retries)
+        return final_dest
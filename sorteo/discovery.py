@@ -0,0 +1,192 @@
+"""File discovery: a single-pass os.scandir walker with precompiled type matching.
+
+:func:`parallel_scan_files` lists folders on a thread pool for network
+mounts, where every listing is a round-trip and the single walker spends
+most of its time waiting.
+"""
+import os
+import threading
+from collections import deque
+
+SCAN_AHEAD = 4096  # folder listings the pool may hold before the caller has consumed them
+
+
+class TypeMatcher:
+    """Matches file names against a list of extensions.
+
+    Plain extensions ('jpg') are looked up in a frozenset by the lowercased
+    suffix; compound ones ('tar.gz') fall back to one str.endswith call with
+    a prebuilt tuple.
+    """
+    def __init__(self, file_types):
+        types = [ft.lower().lstrip(".") for ft in file_types]
+        self.simple = frozenset(ft for ft in types if "." not in ft)
+        self.compound = tuple(f".{ft}" for ft in types if "." in ft)
+
+    def __call__(self, name):
+        name = name.lower()
+        dot = name.rfind(".")
+        if dot != -1 and name[dot + 1:] in self.simple: return True
+        return bool(self.compound) and name.endswith(self.compound)
+
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def scan_files(origin, file_types, recursive=True, exclude=None):
+    """Yields an os.DirEntry for every matching file under ``origin``.
+
+    Matches os.walk's traversal order and rules (symlinked folders are not
+    followed, unreadable subfolders are skipped). ``exclude`` is a folder,
+    typically the destination, that is skipped when nested under the origin.
+    Callers can use ``entry.stat()``: it is cached on the entry and free on
+    Windows, so the date code never needs a second stat call.
+    """
+    matches = TypeMatcher(file_types)
+    excluded = _norm(exclude) if exclude else None
+    if not recursive:
+        with os.scandir(origin) as it:
+            for entry in it:
+                if entry.is_file() and matches(entry.name): yield entry
+        return
+
+    if excluded and _norm(origin) == excluded: return
+    stack = [origin]
+    while stack:
+        dirpath = stack.pop(); subdirs = []
+        try:
+            it = os.scandir(dirpath)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir()
+                except OSError:
+                    is_dir = False
+                if is_dir:
+                    if not entry.is_symlink() and not (excluded and _norm(entry.path) == excluded): subdirs.append(entry.path)
+                elif matches(entry.name):
+                    yield entry
+        stack.extend(reversed(subdirs))
+
+
+def _list_dir(dirpath, matches, excluded):
+    """Returns (matching file entries, subfolder paths) of one folder, in listing order; None if unreadable."""
+    files = []; subdirs = []
+    try:
+        it = os.scandir(dirpath)
+    except OSError:
+        return None
+    with it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink() and not (excluded and _norm(entry.path) == excluded): subdirs.append(entry.path)
+            elif matches(entry.name):
+                files.append(entry)
+    return files, subdirs
+
+
+class _Traversal:
+    """Work-stealing folder lister behind :func:`parallel_scan_files`.
+
+    Each worker pushes the subfolders it finds onto its own deque and pops
+    from that end (depth first, like the caller's walk), and an idle worker
+    steals from the other end of another worker's deque, so the big
+    untouched branches move between threads. Listings wait in ``results``
+    until the caller reaches them; past SCAN_AHEAD the workers pause, and
+    the caller lists a folder it needs itself if no worker has started it,
+    so it never waits on a paused pool.
+    """
+    def __init__(self, matches, excluded, workers):
+        self.matches = matches; self.excluded = excluded
+        self.deques = [deque() for _ in range(workers)]
+        self.state = {}    # folder -> "queued" | "listing" | "done"
+        self.results = {}  # folder -> listing (or None if unreadable), until consumed
+        self.lock = threading.Lock(); self.changed = threading.Condition(self.lock)
+        self.closed = False
+        self.threads = [threading.Thread(target=self._work, args=(n,), name=f"sorteo-scan-{n}", daemon=True) for n in range(workers)]
+
+    def queue(self, owner, folders):
+        """Queues folders for listing; the caller holds the lock."""
+        for folder in reversed(folders): # so popping the right end yields them in listing order
+            if folder not in self.state: self.state[folder] = "queued"; self.deques[owner].append(folder)
+        self.changed.notify_all()
+
+    def _take(self, own):
+        """Pops a folder to list, own deque first, else stolen from the far end of another; the caller holds the lock."""
+        deques = self.deques
+        for offset in range(len(deques)):
+            d = deques[(own + offset) % len(deques)]
+            while d:
+                folder = d.pop() if offset == 0 else d.popleft()
+                if self.state.get(folder) == "queued": self.state[folder] = "listing"; return folder
+        return None
+
+    def _work(self, own):
+        while True:
+            with self.lock:
+                folder = None
+                while not self.closed:
+                    if len(self.results) < SCAN_AHEAD: folder = self._take(own)
+                    if folder is not None: break
+                    self.changed.wait(0.5)
+                if self.closed: return
+            listing = _list_dir(folder, self.matches, self.excluded)
+            with self.lock:
+                self.state[folder] = "done"; self.results[folder] = listing
+                if listing: self.queue(own, listing[1])
+                self.changed.notify_all()
+
+    def listing(self, folder):
+        """Returns the listing of ``folder`` once it exists, listing it on this thread if no worker has started it."""
+        with self.lock:
+            while True:
+                status = self.state.get(folder)
+                if status == "done":
+                    self.state.pop(folder)
+                    if len(self.results) == SCAN_AHEAD: self.changed.notify_all() # paused workers may go on
+                    return self.results.pop(folder)
+                if status != "listing": self.state[folder] = "listing"; break
+                self.changed.wait()
+        listing = _list_dir(folder, self.matches, self.excluded)
+        with self.lock:
+            self.state.pop(folder, None)
+            if listing: self.queue(0, listing[1])
+        return listing
+
+    def close(self):
+        with self.lock: self.closed = True; self.changed.notify_all()
+
+
+def parallel_scan_files(origin, file_types, recursive=True, exclude=None, workers=8):
+    """Like :func:`scan_files`, with folder listings fanned out over ``workers`` threads.
+
+    Yields the same entries in the same order as scan_files, so results
+    are stable whatever the thread timing; only the listing is parallel.
+    The destination rule, symlinked folders and unreadable folders are
+    handled as in scan_files.
+    """
+    if not recursive or workers <= 1:
+        yield from scan_files(origin, file_types, recursive, exclude)
+        return
+    excluded = _norm(exclude) if exclude else None
+    if excluded and _norm(origin) == excluded: return
+    traversal = _Traversal(TypeMatcher(file_types), excluded, workers)
+    with traversal.lock: traversal.queue(0, [origin])
+    for thread in traversal.threads: thread.start()
+    try:
+        stack = [origin]
+        while stack:
+            listing = traversal.listing(stack.pop())
+            if listing is None: continue
+            files, subdirs = listing
+            yield from files
+            stack.extend(reversed(subdirs))
+    finally:
+        traversal.close()
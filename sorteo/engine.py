@@ -0,0 +1,531 @@
+"""Headless sorting engine shared by the GUI and the command line.
+
+Nothing in here may import customtkinter or PIL: the engine has to run on
+servers without a display.
+"""
+import errno
+import os
+import shutil
+import queue
+import threading
+import time
+
+from .capture import DATE_SOURCES, CaptureDates
+from .copying import COPY_STRATEGIES, Copier
+from .dedup import DEDUP_MODES, Deduplicator
+from .destindex import DestinationIndex
+from .discovery import parallel_scan_files
+from .journal import JOURNAL_BATCH, JOURNAL_BATCH_SECONDS, Journal, default_journal_dir
+from .manifest import RunManifest
+from .plan import PlanWriter
+from .rules import RuleRouter
+from .runindex import RunIndex
+from .stats import RunStats
+from .templates import CompiledTemplate, TemplateError, template_for
+
+STRUCTURES = ["Year/Month", "Year/Month/Day", "File Type", "File Type/Year/Month", "Topic/Year/Month", "Custom..."]
+OPERATIONS = ["Move", "Copy"]
+QUEUE_SIZE_PER_WORKER = 64  # discovered-but-unprocessed files allowed per worker
+_DONE = object()
+
+
+class SortError(Exception):
+    """Raised when a sort cannot be started because its options are invalid."""
+
+
+def device_of(path):
+    """Returns st_dev of ``path``, or of its nearest existing parent if it does not exist yet."""
+    path = os.path.abspath(path)
+    while True:
+        try: return os.stat(path).st_dev
+        except FileNotFoundError:
+            parent = os.path.dirname(path)
+            if parent == path: raise
+            path = parent
+
+
+def parse_file_types(text):
+    """Turns 'pdf, .JPG,docx' into ['pdf', 'jpg', 'docx']."""
+    return [ft.strip().lower().lstrip(".") for ft in text.split(',') if ft.strip()]
+
+
+class SortOptions:
+    """Snapshot of everything a run needs, taken once before the run starts."""
+    def __init__(self, origin, dest, file_types, structure="Year/Month", operation="Move",
+                 recursive=True, topic="", custom_pattern="", workers=1, device_workers=None, copy_strategy="copy",
+                 incremental=False, dedup="off", journal_dir=None, date_source="created", rules=None,
+                 verify=False, bandwidth_limit=0, scan_workers=1):
+        self.origin = origin
+        self.dest = dest
+        self.file_types = parse_file_types(file_types) if isinstance(file_types, str) else [ft.lower() for ft in file_types]
+        self.structure = structure
+        self.operation = operation
+        self.recursive = recursive
+        self.topic = topic.strip()
+        self.custom_pattern = custom_pattern
+        self.workers = workers
+        self.device_workers = device_workers or {}  # {path on a device: workers for that device}
+        self.copy_strategy = copy_strategy
+        self.incremental = incremental
+        self.dedup = dedup
+        self.journal_dir = journal_dir  # where Move runs keep their journal (default: DEST/.sorteo/journals)
+        self.date_source = date_source  # 'created' (st_ctime), 'modified' (st_mtime) or 'capture' (EXIF/MP4, else st_mtime)
+        self.rules = list(rules or [])  # routing rule lines, tried before the structure (see sorteo.rules)
+        self.verify = verify  # hash copies as they are made and check them before a Move deletes the source
+        self.bandwidth_limit = bandwidth_limit  # MB/s across all workers for streamed copies; 0 for no cap
+        self.scan_workers = scan_workers  # threads listing folders during discovery; more than 1 pays off on network mounts
+
+    def validate(self):
+        if not all([self.origin, self.dest, self.file_types or self.rules]):
+            raise SortError("Please select origin, destination, and at least one file type.")
+        if not os.path.isdir(self.origin):
+            raise SortError("Origin folder does not exist.")
+        if self.structure not in STRUCTURES:
+            raise SortError(f"Unknown sorting structure: {self.structure}")
+        if self.operation not in OPERATIONS:
+            raise SortError(f"Unknown operation: {self.operation}")
+        is_custom = self.structure == "Custom..."
+        if ("Topic" in self.structure or (is_custom and "{topic}" in self.custom_pattern)) and not self.topic:
+            raise SortError("Please enter a Topic Name for this structure.")
+        if is_custom and not self.custom_pattern:
+            raise SortError("Please enter a Custom Structure pattern.")
+        try: self.compile_template()
+        except TemplateError as e: raise SortError(str(e))
+        if self.workers < 1 or self.scan_workers < 1 or any(n < 1 for n in self.device_workers.values()):
+            raise SortError("The number of workers must be at least 1.")
+        if self.copy_strategy not in COPY_STRATEGIES:
+            raise SortError(f"Unknown copy strategy: {self.copy_strategy}")
+        if self.dedup not in DEDUP_MODES:
+            raise SortError(f"Unknown duplicate handling: {self.dedup}")
+        if self.date_source not in DATE_SOURCES:
+            raise SortError(f"Unknown date source: {self.date_source}")
+        if self.bandwidth_limit < 0:
+            raise SortError("The bandwidth limit cannot be negative.")
+
+    def workers_for_dest(self):
+        """Pool size for this run: the device_workers entry on the same device as dest, else workers."""
+        if self.device_workers:
+            try:
+                dest_dev = device_of(self.dest)
+                for path, count in self.device_workers.items():
+                    if os.path.exists(path) and os.stat(path).st_dev == dest_dev: return count
+            except OSError:
+                pass
+        return self.workers
+
+    def to_dict(self):
+        """Plain-JSON form of these options; ``SortOptions.from_dict`` turns it back."""
+        return dict(vars(self))
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def compile_template(self):
+        template = CompiledTemplate(template_for(self.structure, self.custom_pattern), self.topic, self.dest, self.date_source)
+        return RuleRouter(self.rules, template, self.topic, self.dest, self.date_source, self.file_types) if self.rules else template
+
+    def scan_types(self):
+        """The file types to discover: the selected ones plus any a rule names."""
+        if not self.rules: return self.file_types
+        return self.file_types + [ext for ext in RuleRouter(self.rules, CompiledTemplate("")).extensions if ext not in self.file_types]
+
+    @property
+    def structure_label(self):
+        return self.custom_pattern if self.structure == "Custom..." else self.structure
+
+
+class SortEngine:
+    """Plans and executes a sort run.
+
+    ``log`` receives one message string at a time and ``progress`` receives
+    (processed, discovered so far); both default to no-ops so the engine can run silently.
+    ``results``, when given, is a :class:`~sorteo.results.ResultStore` that gets one row per file.
+    """
+    def __init__(self, options, log=None, progress=None, results=None):
+        self.options = options
+        self.results = results
+        self.log = log or (lambda message: None)
+        self.progress = progress or (lambda done, total: None)
+        self.template = options.compile_template()
+        self.stats = RunStats()
+        self.run_index = None; self.dedup = None; self.journal = None; self.capture = None; self.plan_writer = None; self.manifest = None
+        self._lock = threading.Lock()
+        self.dest_index = DestinationIndex(self.stats, self._created_dirs)
+        self.copier = Copier(options.copy_strategy, verify=options.verify, bandwidth=int(options.bandwidth_limit * 1e6), on_bytes=self._copy_progress)
+        self._error = None
+
+    @property
+    def processed(self): return self.stats.counts["files_processed"]
+
+    @property
+    def discovered(self): return self.stats.counts["files_discovered"]
+
+    @property
+    def skipped(self): return self.stats.counts["files_skipped"]
+
+    @property
+    def duplicates(self): return self.stats.counts["duplicates"]
+
+    def scan_files(self):
+        """Yields a DirEntry for every file this run should sort."""
+        return parallel_scan_files(self.options.origin, self.options.scan_types(), self.options.recursive,
+                                   exclude=self.options.dest, workers=self.options.scan_workers)
+
+    def get_file_list(self):
+        return [entry.path for entry in self.scan_files()]
+
+    def destination_dir(self, source_path, entry=None, taken=None):
+        """Returns the folder (below dest) that ``source_path`` belongs in.
+
+        Pass the DirEntry from discovery as ``entry`` to reuse its stat result,
+        and a capture timestamp as ``taken`` to date the file by it. Returns
+        None for a file of a type only a rule names when no rule matches it.
+        """
+        filename = os.path.basename(source_path); st = None
+        if self.template.needs_stat:
+            if not entry: self.stats.add(stat_calls=1)
+            try: st = entry.stat() if entry else os.stat(source_path)
+            except OSError as e: self.log(f"Warning: Could not get date for {filename}: {e}.")
+        return self.template.render(filename, st, taken)
+
+    def plan(self, entries=None):
+        """Lazily yields (source_path, target_dir, stat) for this run, as discovery finds them.
+
+        ``entries`` replaces discovery with any iterable of DirEntry-like
+        objects (``path``, ``name``, ``stat()``), as the folder watcher does.
+        ``stat`` is the DirEntry's (cached) stat result, or None if stat failed.
+        In incremental runs files the index knows to be unchanged are skipped.
+        With the 'capture' date source, capture dates are read ahead on a thread pool.
+        """
+        stats = self.stats; clock = time.perf_counter
+        items = self._discovered(entries)
+        items = self.capture.with_capture_times(items) if self.capture is not None else ((entry, st, None) for entry, st in items)
+        for entry, st, taken in items:
+            t = clock(); target = self.destination_dir(entry.path, entry, taken); stats.add_time("path_rendering", clock() - t)
+            if target is None: stats.add(files_skipped=1); continue # not a selected type, and no rule wants it
+            yield entry.path, target, st
+
+    def planned(self, records):
+        """Turns saved plan records into execute() items, without discovery or path rendering.
+
+        Each source is stat'ed once and must still have the size and mtime it
+        had when the plan was made; the planned name is claimed again, so a
+        file that appeared there since gets a suffix instead of being overwritten.
+        """
+        stats = self.stats; results = self.results
+        for record in records:
+            source = record["src"]; filename = os.path.basename(source)
+            if record["op"] == "skip":
+                stats.add(duplicates=1); self.log(f"Skipped duplicate: {filename} (same as {record.get('dup')})")
+                if results is not None: results.add(source, record.get("dup"), "skip", "skipped")
+                continue
+            stats.add(stat_calls=1)
+            try: st = os.stat(source)
+            except OSError as e:
+                self.log(f"Warning: Skipping {source}: {e}.")
+                if results is not None: results.add(source, record["dst"], record["op"], "skipped")
+                continue
+            if st.st_size != record.get("size") or st.st_mtime_ns != record.get("mtime_ns"):
+                self.log(f"Warning: Skipping {source}: it changed after the plan was made.")
+                if results is not None: results.add(source, record["dst"], record["op"], "skipped")
+                continue
+            folder = os.path.dirname(record["dst"])
+            final_dest = self.dest_index.claim(folder, os.path.basename(record["dst"]))
+            yield source, folder, st, final_dest, None, record.get("dup") if record["op"] == "link" else None
+
+    def _discovered(self, entries=None):
+        """Yields (DirEntry, stat or None) for every file that still needs sorting."""
+        stats = self.stats
+        for entry in self.scan_files() if entries is None else entries:
+            st = None; stats.add(stat_calls=1)
+            try: st = entry.stat()
+            except OSError: pass
+            if st is not None and self.run_index is not None and self.run_index.is_unchanged(entry.path, st):
+                stats.add(files_skipped=1)
+                continue
+            yield entry, st
+
+    def process_file(self, source_path, target_base, dry_run=False, st=None, final_dest=None, journal_id=None, duplicate=None):
+        """Places one file.
+
+        ``final_dest`` is set when the name was claimed up front (journal or
+        saved plan), ``journal_id`` when the move is journaled, and
+        ``duplicate`` when a saved plan says to hardlink the file to it.
+        """
+        if duplicate is not None: return self._link_duplicate(source_path, final_dest, duplicate, dry_run, st, journal_id)
+        if self.dedup is not None and st is not None and st.st_size:
+            with self.dedup.lock_for(st.st_size):
+                duplicate = self.dedup.find_duplicate(source_path, st)
+                if duplicate is not None: return self._place_duplicate(source_path, target_base, duplicate, dry_run, st, final_dest, journal_id)
+                final_dest = self._place(source_path, target_base, dry_run, st, final_dest, journal_id)
+                self.dedup.register(final_dest, st.st_size, source_path if dry_run else None)
+                return final_dest
+        return self._place(source_path, target_base, dry_run, st, final_dest, journal_id)
+
+    def _place(self, source_path, target_base, dry_run, st, final_dest=None, journal_id=None):
+        filename = os.path.basename(source_path)
+        log_prefix = "[DRY RUN] " if dry_run else ""
+        is_copy = self.options.operation == "Copy"
+        op_verb = "Would copy" if is_copy else "Would move"
+        final_dest = final_dest or self.dest_index.claim(target_base, filename, create=not dry_run)
+        if not dry_run:
+            self._refuse_overwrite(final_dest, journal_id)
+            t = time.perf_counter()
+            if is_copy:
+                method = self.copier.copy(source_path, final_dest, st.st_size if st is not None else None)
+                op_verb = "Copied" if method == "copy" else f"Copied ({method})"
+            else: shutil.move(source_path, final_dest, copy_function=self.copier.copy_file); op_verb = "Moved"
+            self.stats.add_time("io", time.perf_counter() - t)
+            if journal_id is not None: self.journal.done(journal_id)
+            if self.run_index is not None and st is not None: self.run_index.record(source_path, st, final_dest, self.options.operation)
+            if self.manifest is not None: # the placed file's own stat: coarse-timestamp drives round the mtime
+                self.manifest.record(self.options.operation.lower(), source_path, final_dest, os.stat(final_dest))
+        elif self.plan_writer is not None: self.plan_writer.add(self.options.operation.lower(), source_path, final_dest, st)
+        if self.results is not None: self.results.add(source_path, final_dest, self.options.operation.lower(), "planned" if dry_run else "done")
+        self.log(f"{log_prefix}{op_verb}: {filename} -> {final_dest}")
+        return final_dest
+
+    def _place_duplicate(self, source_path, target_base, duplicate, dry_run, st, final_dest=None, journal_id=None):
+        """Skips ``source_path`` or hardlinks it to its identical ``duplicate``, per the dedup mode."""
+        filename = os.path.basename(source_path)
+        if self.dedup.mode == "skip":
+            self.stats.add(duplicates=1)
+            self.log(f"{'[DRY RUN] ' if dry_run else ''}Skipped duplicate: {filename} (same as {duplicate})")
+            if journal_id is not None: self.journal.done(journal_id, "skipped")
+            if not dry_run and self.run_index is not None: self.run_index.record(source_path, st, duplicate, "Skip")
+            if dry_run and self.plan_writer is not None: self.plan_writer.add("skip", source_path, None, st, duplicate)
+            if self.results is not None: self.results.add(source_path, duplicate, "skip", "skipped")
+            return duplicate
+        final_dest = final_dest or self.dest_index.claim(target_base, filename, create=not dry_run)
+        return self._link_duplicate(source_path, final_dest, duplicate, dry_run, st, journal_id)
+
+    def _link_duplicate(self, source_path, final_dest, duplicate, dry_run, st, journal_id=None):
+        filename = os.path.basename(source_path)
+        log_prefix = "[DRY RUN] " if dry_run else ""
+        self.stats.add(duplicates=1)
+        action = "link"
+        if not dry_run:
+            t = time.perf_counter()
+            try:
+                os.link(duplicate, final_dest)
+            except OSError as e: # e.g. a filesystem without hardlinks: store it normally
+                self.log(f"Warning: Could not hardlink {filename} to {duplicate}: {e}.")
+                self._refuse_overwrite(final_dest, journal_id)
+                if self.options.operation == "Copy": self.copier.copy(source_path, final_dest)
+                else: shutil.move(source_path, final_dest, copy_function=self.copier.copy_file)
+                action = self.options.operation.lower()
+            else:
+                if self.options.operation == "Move": os.remove(source_path)
+            self.stats.add_time("io", time.perf_counter() - t)
+            if journal_id is not None: self.journal.done(journal_id)
+            if self.run_index is not None: self.run_index.record(source_path, st, final_dest, self.options.operation)
+            if self.manifest is not None: # a link carries the duplicate's mtime, so record what is actually there
+                self.manifest.record(self.options.operation.lower(), source_path, final_dest, os.stat(final_dest))
+        elif self.plan_writer is not None: self.plan_writer.add("link", source_path, final_dest, st, duplicate)
+        if self.dedup is not None: self.dedup.register(final_dest, st.st_size, source_path if dry_run else None)
+        if self.results is not None: self.results.add(source_path, final_dest, action, "planned" if dry_run else "done")
+        self.log(f"{log_prefix}{'Would link' if dry_run else 'Linked'} duplicate: {filename} -> {final_dest} (same as {duplicate})")
+        return final_dest
+
+    def _refuse_overwrite(self, final_dest, journal_id=None):
+        """Raises if a file appeared at ``final_dest`` after its name was claimed, e.g. one another program wrote."""
+        if not os.path.lexists(final_dest): return
+        if journal_id is not None: self.journal.done(journal_id, "not_moved")  # else a resume would remove it as a partial copy
+        raise FileExistsError(errno.EEXIST, "Not overwriting a file that appeared after its name was claimed", final_dest)
+
+    def execute(self, plan, dry_run=False):
+        """Carries out ``plan`` (any iterable of (source, target_dir, stat)); returns files processed.
+
+        A producer thread pulls the plan into a bounded queue while consumers
+        process it, so the first file is handled as soon as it is discovered
+        and memory stays flat however large the tree is. Real runs use
+        :meth:`SortOptions.workers_for_dest` consumers; progress is reported as
+        (processed, discovered so far). When :attr:`journal` is set, destination
+        names are claimed and journaled in fsynced batches before any of the
+        files in a batch is moved.
+        """
+        self.stats = RunStats(); self.dest_index = DestinationIndex(self.stats, self._created_dirs); self._error = None
+        if self.capture is not None: self.capture.stats = self.stats
+        workers = 1 if dry_run else self.options.workers_for_dest()
+        work = queue.Queue(maxsize=QUEUE_SIZE_PER_WORKER * workers); stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(plan, work, stop, workers), name="sorteo-discovery", daemon=True)
+        consumers = [threading.Thread(target=self._consume, args=(work, stop, dry_run), name=f"sorteo-worker-{n}", daemon=True) for n in range(workers - 1)]
+        producer.start()
+        for thread in consumers: thread.start()
+        self._consume(work, stop, dry_run)
+        for thread in consumers: thread.join()
+        stop.set(); producer.join(); self.stats.finish()
+        if self._error is not None: raise self._error
+        self.progress(self.processed, self.discovered)
+        return self.processed
+
+    def _fail(self, error, stop):
+        with self._lock:
+            if self._error is None: self._error = error
+        stop.set()
+
+    @staticmethod
+    def _put(work, item, stop):
+        while not stop.is_set():
+            try: work.put(item, timeout=0.1); return True
+            except queue.Full: continue
+        return False
+
+    def _journal_batch(self, batch):
+        """Claims final names for ``batch`` and journals them; returns the items extended with (final_dest, journal_id)."""
+        finals = [item[3] if len(item) > 3 else self.dest_index.claim(item[1], os.path.basename(item[0])) for item in batch]
+        ids = self.journal.plan_batch(list(zip((item[0] for item in batch), finals)))
+        return [item[:3] + (final, entry_id) + item[5:] for item, final, entry_id in zip(batch, finals, ids)]
+
+    def _produce(self, plan, work, stop, consumers):
+        stats = self.stats; clock = time.perf_counter; planning = 0.0; plan = iter(plan)
+        batch = []; batch_started = 0.0
+        try:
+            while True:
+                t = clock()
+                try: item = next(plan)
+                except StopIteration: break
+                finally: planning += clock() - t
+                stats.add(files_discovered=1)
+                if self.journal is None:
+                    if not self._put(work, item, stop): return
+                    continue
+                if not batch: batch_started = clock()
+                batch.append(item)
+                if len(batch) >= JOURNAL_BATCH or clock() - batch_started >= JOURNAL_BATCH_SECONDS:
+                    for journaled in self._journal_batch(batch):
+                        if not self._put(work, journaled, stop): return
+                    batch = []
+            if batch:
+                for journaled in self._journal_batch(batch):
+                    if not self._put(work, journaled, stop): return
+            stats.discovery_done = True
+        except BaseException as e:
+            self._fail(e, stop)
+        finally:
+            # time spent pulling the plan, minus what plan() itself recorded as path rendering
+            stats.add_time("discovery", max(0.0, planning - stats.seconds["path_rendering"]))
+            for _ in range(consumers): self._put(work, _DONE, stop)
+
+    def _consume(self, work, stop, dry_run):
+        while not stop.is_set():
+            try: item = work.get(timeout=0.1)
+            except queue.Empty: continue
+            if item is _DONE: return
+            try:
+                self.process_file(item[0], item[1], dry_run, *item[2:])
+            except BaseException as e:
+                if self.results is not None: self.results.add(item[0], None, self.options.operation.lower(), "failed")
+                self._fail(e, stop); return
+            done, total = self.stats.file_done(item[2].st_size if item[2] is not None else 0)
+            try: self.progress(done, total)
+            except BaseException as e: self._fail(e, stop); return # a failing callback stops the run like a failing file
+
+    def _created_dirs(self, folders):
+        if self.manifest is not None: self.manifest.created_dirs(folders)
+
+    def _copy_progress(self, dest_path, done, size):
+        """Copier callback: counts the streamed part of large files towards progress."""
+        partial = self.stats.copy_progress(dest_path, done, size)
+        self.progress(self.processed + partial, self.discovered)
+
+    def log_header(self, dry_run=False):
+        opts = self.options
+        self.log(f"--- Starting {'Dry Run' if dry_run else f'{opts.operation} Operation'} ---")
+        self.log(f"Origin: {opts.origin}")
+        self.log(f"Destination: {opts.dest}")
+        self.log(f"File types: {', '.join(opts.file_types)}")
+        self.log(f"Structure: {opts.structure_label}")
+        for number, rule in enumerate(opts.rules, 1): self.log(f"Rule {number}: {rule}")
+        self.log(f"Include subfolders: {'Yes' if opts.recursive else 'No'}")
+        if opts.incremental: self.log("Incremental: skipping files sorted by a previous run")
+        if opts.dedup != "off": self.log(f"Duplicates: {opts.dedup}")
+        if opts.verify or opts.bandwidth_limit:
+            self.log(f"Copies: {'verified' if opts.verify else 'not verified'}, {f'at most {opts.bandwidth_limit:g} MB/s' if opts.bandwidth_limit else 'no bandwidth cap'}")
+        if opts.date_source != "created" and self.template.needs_date: self.log(f"Dates: {opts.date_source}")
+        self.log("-" * 20)
+
+    def _open(self, dry_run, records=None, index=False):
+        """Opens what a run keeps between files: run index, duplicate index, capture-date cache and, for real runs, the manifest."""
+        if not dry_run: self.manifest = RunManifest(self.options.dest, self.options.to_dict())
+        if self.options.incremental or index: self.run_index = RunIndex(self.options.dest, read_only=dry_run)
+        if records is not None:
+            self.log("Executing a saved plan; files added to the origin since it was made are not included.")
+        elif self.options.dedup != "off":
+            self.log("Indexing destination for duplicates...")
+            self.dedup = Deduplicator(self.options.dest, self.options.dedup, read_only=dry_run)
+        if self.options.date_source == "capture" and self.template.needs_date and records is None:
+            self.capture = CaptureDates(self.options.dest, read_only=dry_run, stats=self.stats)
+
+    def _run(self, items, dry_run):
+        """execute() inside a journal for Move runs; the journal is deleted once the run completes."""
+        if self.options.operation == "Move" and not dry_run:
+            self.journal = Journal.create(self.options.journal_dir or default_journal_dir(self.options.dest), self.options.to_dict())
+        self.execute(items, dry_run)
+        if self.journal is not None: # finished cleanly: nothing to resume or roll back
+            self.journal.close("complete"); os.remove(self.journal.path); self.journal = None
+
+    def _close(self, status="complete"):
+        if self.manifest is not None: self.manifest.close(status); self.manifest = None
+        if self.run_index is not None: self.run_index.close(); self.run_index = None
+        if self.dedup is not None: self.dedup.close(); self.dedup = None
+        if self.capture is not None: self.capture.close(); self.capture = None
+        if self.plan_writer is not None: self.plan_writer.close(); self.plan_writer = None
+        if self.journal is not None:
+            self.journal.close(); self.log(f"Journal kept for resume/roll back: {self.journal.path}"); self.journal = None
+
+    def sort_files(self, dry_run=False, save_plan=None, records=None):
+        """Runs a whole sort (header, plan, execute, summary); returns files processed.
+
+        A dry run with ``save_plan`` writes its decisions to that path as a
+        plan; passing a saved plan's ``records`` executes it instead of
+        discovering and planning again.
+        """
+        self.log_header(dry_run)
+        status = "failed"
+        try:
+            self._open(dry_run, records)
+            if dry_run and save_plan:
+                options = self.options.to_dict(); options.pop("journal_dir", None)  # a local path; the machine running the plan uses its default
+                self.plan_writer = PlanWriter(save_plan, options)
+            self._run(self.plan() if records is None else self.planned(records), dry_run); status = "complete"
+            if self.plan_writer is not None: self.log(f"Plan saved to {self.plan_writer.path} ({self.plan_writer.count} files).")
+            if self.skipped:
+                reason = "already sorted by a previous run" + (", or of a type only a rule names that no rule matched" if self.options.rules else "")
+                self.log(f"Skipped {self.skipped} files {reason}.")
+            elif not self.discovered: self.log("No matching files found to process.")
+            if self.duplicates: self.log(f"Found {self.duplicates} duplicate files.")
+            if self.processed and not dry_run:
+                self.log("-" * 20)
+                for line in self.stats.summary_lines(): self.log(line)
+        finally:
+            self._close(status)
+            self.log(f"\n{'Dry run complete!' if dry_run else 'Operation complete!'} Processed {self.processed} files.")
+        return self.processed
+
+    def watch(self, watcher, stop):
+        """Sorts the files ``watcher`` reports as settled, batch by batch, until ``stop`` is set.
+
+        The indexes stay open between batches. Copy runs always use the run
+        index, so files left in the origin are not copied again when they
+        are seen again. Returns the number of files processed.
+        """
+        self.log_header()
+        self.log(f"Watching {self.options.origin} for new files ({watcher.kind})...")
+        total = 0
+        try:
+            self._open(False, index=self.options.operation == "Copy")
+            for batch in watcher.batches(stop):
+                try:
+                    self._run(self.plan(batch), False)
+                except Exception as e: # keep watching; the files that failed stay in the origin
+                    self.log(f"ERROR: {e}")
+                    if self.journal is not None:
+                        self.journal.close(); self.log(f"Journal kept for resume/roll back: {self.journal.path}"); self.journal = None
+                total += self.processed
+                if self.processed: self.log(f"Sorted {self.processed} new files ({total} since watching started).")
+        finally:
+            self._close()
+            self.log(f"\nStopped watching. Processed {total} files.")
+        return total
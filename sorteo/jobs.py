@@ -0,0 +1,155 @@
+"""Job queues: several origin -> destination sorts, scheduled by device.
+
+Each job is a full set of sort options (its own structure, file types and
+operation). A job holds the physical devices (``st_dev``) of its origin and
+destination while it runs, and at most ``per_device`` jobs hold a device at
+once, so jobs on independent disks run in parallel while jobs sharing a
+spindle run one after the other instead of thrashing it. Jobs start in queue
+order, except that a job waiting for a busy device does not hold up later
+jobs whose devices are free. Two jobs writing to the same destination folder
+never run together, whatever ``per_device`` is, because their name claims
+would race.
+
+Job files are JSON::
+
+    {"sorteo_jobs": 1, "jobs": [{"name": "card A", "origin": "/media/a", "dest": "/mnt/archive", "file_types": "jpg, mp4"}, ...]}
+
+where every job takes the keyword arguments of :class:`SortOptions`.
+"""
+import json
+import os
+import threading
+
+from .engine import SortEngine, SortError, SortOptions, device_of
+
+JOBS_VERSION = 1
+PER_DEVICE = 1
+JOB_STATUSES = ["queued", "running", "done", "failed", "cancelled"]
+
+
+class JobError(ValueError):
+    """Raised for a file that is not a readable job list."""
+
+
+class Job:
+    """One queued sort: its options and, once scheduled, its outcome."""
+    def __init__(self, options, name=None):
+        self.options = options
+        self.name = name or f"{os.path.basename(os.path.normpath(options.origin)) or options.origin} -> {options.dest}"
+        self.status = "queued"
+        self.processed = 0
+        self.error = None
+
+    def resources(self):
+        """The devices this job keeps busy, and its destination folder."""
+        devices = set()
+        for path in (self.options.origin, self.options.dest):
+            try: devices.add(("dev", device_of(path)))
+            except OSError: devices.add(("dev", os.path.abspath(path)))  # unreachable: it fails on its own
+        return devices, ("dest", os.path.normcase(os.path.abspath(self.options.dest)))
+
+    def to_dict(self):
+        data = self.options.to_dict(); data["name"] = self.name
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data); name = data.pop("name", None)
+        return cls(SortOptions.from_dict(data), name)
+
+
+def read_jobs(path):
+    """Returns the jobs listed in the job file at ``path``."""
+    try:
+        with open(path, encoding="utf-8") as f: data = json.load(f)
+    except ValueError as e:
+        raise JobError(f"{path} is not valid JSON: {e}")
+    if not isinstance(data, dict) or data.get("sorteo_jobs") != JOBS_VERSION or not isinstance(data.get("jobs"), list):
+        raise JobError(f"{path} is not a Sorteo job list (version {JOBS_VERSION}).")
+    jobs = []
+    for number, entry in enumerate(data["jobs"], 1):
+        try: jobs.append(Job.from_dict(entry))
+        except TypeError as e: raise JobError(f"{path}, job {number}: {e}")
+    return jobs
+
+
+def write_jobs(path, jobs):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"sorteo_jobs": JOBS_VERSION, "jobs": [job.to_dict() for job in jobs]}, f, indent=2)
+
+
+class JobScheduler:
+    """Runs queued jobs on their own threads, limiting how many share a device.
+
+    ``make_engine(job, log)`` returns the :class:`SortEngine` for a job; by
+    default a plain engine whose log lines are prefixed with the job name.
+    ``on_change(job)`` is called whenever a job changes status.
+    """
+    def __init__(self, jobs, per_device=PER_DEVICE, log=None, make_engine=None, on_change=None):
+        if per_device < 1: raise SortError("The number of jobs per device must be at least 1.")
+        self.jobs = list(jobs)
+        self.per_device = per_device
+        self.log = log or (lambda message: None)
+        self.make_engine = make_engine or (lambda job, log: SortEngine(job.options, log=log))
+        self.on_change = on_change or (lambda job: None)
+        self._changed = threading.Condition()
+        self._busy = {}  # resource -> running jobs holding it
+
+    def _set_status(self, job, status, error=None):
+        job.status = status; job.error = error
+        self.on_change(job)
+
+    def _job_log(self, job):
+        """The job's engine log: every line tagged with the job name, after any leading newline or Warning/ERROR label."""
+        tag = f"[{job.name}] "
+        def log(message):
+            body = message.lstrip("\n"); lead = message[:len(message) - len(body)]
+            if not body.strip(): self.log(message); return
+            label, sep, rest = body.partition(": ")
+            if sep and label in ("Warning", "ERROR"): self.log(f"{lead}{label}: {tag}{rest}")
+            else: self.log(lead + tag + body)
+        return log
+
+    def _free(self, resources):
+        devices, dest = resources
+        return self._busy.get(dest, 0) == 0 and all(self._busy.get(device, 0) < self.per_device for device in devices)
+
+    def _hold(self, resources, delta):
+        devices, dest = resources
+        for resource in (*devices, dest): self._busy[resource] = self._busy.get(resource, 0) + delta
+
+    def _run_job(self, job, resources, dry_run):
+        try:
+            job.processed = self.make_engine(job, self._job_log(job)).sort_files(dry_run)
+            self._set_status(job, "done")
+        except Exception as e:
+            self.log(f"ERROR: [{job.name}] {e}"); self._set_status(job, "failed", str(e))
+        finally:
+            with self._changed: self._hold(resources, -1); self._changed.notify_all()
+
+    def run(self, dry_run=False, stop=None):
+        """Runs every queued job and waits for them; returns the number that failed.
+
+        Invalid jobs fail up front without holding up the others. Once
+        ``stop`` is set no further job is started; running jobs finish.
+        """
+        waiting = []
+        for job in self.jobs:
+            if job.status != "queued": continue
+            try: job.options.validate()
+            except SortError as e: self.log(f"ERROR: [{job.name}] {e}"); self._set_status(job, "failed", str(e)); continue
+            waiting.append((job, job.resources()))
+        threads = []
+        with self._changed:
+            while waiting:
+                if stop is not None and stop.is_set():
+                    for job, _ in waiting: self._set_status(job, "cancelled")
+                    break
+                ready = next((entry for entry in waiting if self._free(entry[1])), None)
+                if ready is None: self._changed.wait(0.5); continue
+                waiting.remove(ready); job, resources = ready
+                self._hold(resources, 1); self._set_status(job, "running")
+                thread = threading.Thread(target=self._run_job, args=(job, resources, dry_run), name=f"sorteo-job-{len(threads)}", daemon=True)
+                thread.start(); threads.append(thread)
+        for thread in threads: thread.join()
+        return sum(job.status == "failed" for job in self.jobs)
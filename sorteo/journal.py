@@ -0,0 +1,188 @@
+"""Crash-safe journal for Move runs, with resume and roll back.
+
+The journal is an append-only JSON-lines file. Before a batch of files is
+moved, one ``plan`` record per file (source and final destination) is
+written and the file is fsynced once for the whole batch; each finished
+move appends a ``done`` record, which becomes durable with the next batch.
+After a crash only the planned-but-not-done entries (at most one batch plus
+the files in flight) need to be checked on disk; everything else is known
+from the journal, so the destination is never rescanned.
+"""
+import itertools
+import json
+import os
+import shutil
+import threading
+import time
+
+from .state import state_path
+
+JOURNAL_DIR_NAME = "journals"
+JOURNAL_BATCH = 256          # plan records per fsync
+JOURNAL_BATCH_SECONDS = 0.5  # ...or fewer, when discovery is slow
+CLOSED = ("complete", "resumed", "rolled_back", "abandoned")
+_sequence = itertools.count(1)  # tells apart journals created in the same second (queued jobs run side by side)
+
+
+def default_journal_dir(dest):
+    return state_path(dest, JOURNAL_DIR_NAME)
+
+
+class Journal:
+    """Writer for one run's journal; safe to call from worker threads."""
+    def __init__(self, path, options):
+        self.path = path
+        self._lock = threading.Lock()
+        self._next_id = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._write({"op": "begin", "started": time.time(), "options": options})
+        self.sync()
+
+    @classmethod
+    def create(cls, journal_dir, options):
+        name = f"journal-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_sequence)}.jsonl"
+        return cls(os.path.join(journal_dir, name), options)
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + "\n")
+
+    def sync(self):
+        self._file.flush(); os.fsync(self._file.fileno())
+
+    def plan_batch(self, moves):
+        """Durably records a batch of (source, final_dest) moves; returns their entry ids."""
+        with self._lock:
+            ids = list(range(self._next_id, self._next_id + len(moves))); self._next_id += len(moves)
+            for entry_id, (source, dest) in zip(ids, moves): self._write({"op": "plan", "id": entry_id, "src": source, "dst": dest})
+            self.sync()
+        return ids
+
+    def done(self, entry_id, status="moved"):
+        with self._lock: self._write({"op": "done", "id": entry_id, "status": status})
+
+    def close(self, status=None):
+        """Closes the journal; ``status`` (e.g. 'complete') marks the run as finished."""
+        with self._lock:
+            if self._file is None: return
+            if status: self._write({"op": "end", "status": status, "ended": time.time()})
+            self.sync(); self._file.close(); self._file = None
+
+
+class JournalState:
+    """What a journal file says about its run."""
+    def __init__(self, path):
+        self.path = path
+        self.options = None; self.started = None; self.status = None
+        self.planned = {}  # id -> (source, dest)
+        self.done = {}     # id -> status
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try: record = json.loads(line)
+                except ValueError: continue # torn last line after a crash
+                op = record.get("op")
+                if op == "plan": self.planned[record["id"]] = (record["src"], record["dst"])
+                elif op == "done": self.done[record["id"]] = record.get("status", "moved")
+                elif op == "begin": self.options = record.get("options"); self.started = record.get("started")
+                elif op == "end": self.status = record.get("status")
+
+    @property
+    def incomplete(self):
+        return self.status not in CLOSED
+
+    def in_flight(self):
+        return [(entry_id, move) for entry_id, move in self.planned.items() if entry_id not in self.done]
+
+    def describe(self):
+        opts = self.options or {}
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.started)) if self.started else "?"
+        moved = sum(status == "moved" for status in self.done.values())
+        return f"{opts.get('origin')} -> {opts.get('dest')}, started {started}, {moved:,} files moved"
+
+
+def find_incomplete(journal_dir):
+    """Returns JournalState for every unfinished journal in ``journal_dir``, oldest first."""
+    states = []
+    try: names = sorted(name for name in os.listdir(journal_dir) if name.startswith("journal-") and name.endswith(".jsonl"))
+    except FileNotFoundError: return states
+    for name in names:
+        try: state = JournalState(os.path.join(journal_dir, name))
+        except OSError: continue
+        if state.incomplete: states.append(state)
+    return states
+
+
+def _mark(state, status):
+    """Closes an interrupted run's journal, then deletes it as there is nothing left to do with it."""
+    with open(state.path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "end", "status": status, "ended": time.time()}) + "\n"); f.flush(); os.fsync(f.fileno())
+    state.status = status
+    try: os.remove(state.path)
+    except OSError: pass # the end record already marks it as finished
+
+
+def settle_in_flight(state, log=None):
+    """Finds out what happened to the planned-but-not-done entries and records it.
+
+    Moved files (destination present, source gone) are marked done. When
+    both exist, a cross-device move died between copying and deleting, so
+    the possibly partial destination copy is removed and the source kept.
+    """
+    log = log or (lambda message: None)
+    with open(state.path, "a", encoding="utf-8") as f:
+        for entry_id, (source, dest) in state.in_flight():
+            src_exists = os.path.lexists(source); dst_exists = os.path.lexists(dest)
+            if dst_exists and not src_exists: status = "moved"
+            elif src_exists and dst_exists:
+                try: os.remove(dest); status = "not_moved"
+                except OSError as e: log(f"Warning: Could not remove partial copy {dest}: {e}."); continue
+            elif src_exists: status = "not_moved"
+            else: log(f"Warning: {source} is missing from both origin and destination."); status = "missing"
+            f.write(json.dumps({"op": "done", "id": entry_id, "status": status}) + "\n"); state.done[entry_id] = status
+        f.flush(); os.fsync(f.fileno())
+
+
+def resume(state, log=None):
+    """Settles an interrupted run and returns its options so the caller can re-run them.
+
+    Files that were already moved are gone from the origin, so re-running the
+    same options only handles what is left.
+    """
+    settle_in_flight(state, log)
+    _mark(state, "resumed")
+    return state.options
+
+
+def rollback(state, log=None):
+    """Moves every file of an interrupted run back to where it came from; returns the count."""
+    log = log or (lambda message: None)
+    settle_in_flight(state, log)
+    dest_root = os.path.abspath((state.options or {}).get("dest") or os.sep)
+    moved_back = 0
+    for entry_id in sorted(state.done, reverse=True):
+        if state.done[entry_id] != "moved": continue
+        source, dest = state.planned[entry_id]
+        if not os.path.lexists(dest): log(f"Warning: {dest} no longer exists; cannot move it back."); continue
+        if os.path.lexists(source): log(f"Warning: {source} exists again; leaving {dest} in place."); continue
+        os.makedirs(os.path.dirname(source) or ".", exist_ok=True)
+        shutil.move(dest, source); moved_back += 1
+        log(f"Moved back: {dest} -> {source}")
+    prune_empty_dirs({os.path.dirname(os.path.abspath(dest)) for _, dest in state.planned.values()}, dest_root)
+    _mark(state, "rolled_back")
+    return moved_back
+
+
+def abandon(state):
+    """Marks an interrupted run as dealt with, without touching any files."""
+    _mark(state, "abandoned")
+
+
+def prune_empty_dirs(folders, root):
+    """Removes now-empty ``folders`` and their empty parents, stopping at ``root``."""
+    root = os.path.abspath(root)
+    for folder in sorted(folders, key=len, reverse=True):
+        folder = os.path.abspath(folder)
+        while folder != root and folder.startswith(root + os.sep):
+            try: os.rmdir(folder)
+            except OSError: break
+            folder = os.path.dirname(folder)
@@ -0,0 +1,53 @@
+"""Thread-safe log pipeline between the sorting thread and the UI."""
+import os
+import queue
+import threading
+
+
+class LogPipeline:
+    """Collects log lines from worker threads for the UI to drain in batches.
+
+    Producers only pay for a queue put (and a buffered file write when
+    ``log_path`` is set); the UI pulls a bounded chunk per frame with
+    :meth:`drain`, so a fast run can never flood the event loop. The file gets
+    every line, even the ones the UI later trims from its ring buffer.
+    """
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._file = None
+        if log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(log_path)), exist_ok=True)
+            self._file = open(log_path, "w", encoding="utf-8", buffering=1 << 16)
+
+    def put(self, message):
+        self._queue.put(message)
+        if self._file is not None:
+            with self._lock:
+                if self._file is not None: self._file.write(message + "\n")
+
+    def drain(self, max_lines):
+        """Returns up to ``max_lines`` queued messages without blocking."""
+        lines = []
+        try:
+            while len(lines) < max_lines: lines.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return lines
+
+    def empty(self):
+        return self._queue.empty()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None: self._file.close(); self._file = None
+
+
+def prune_logs(folder, keep):
+    """Deletes all but the newest ``keep`` sorteo-*.log files in ``folder``."""
+    try: names = sorted(name for name in os.listdir(folder) if name.startswith("sorteo-") and name.endswith(".log"))
+    except OSError: return
+    for name in names[:max(0, len(names) - keep)]:
+        try: os.remove(os.path.join(folder, name))
+        except OSError: pass
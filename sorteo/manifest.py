@@ -0,0 +1,187 @@
+"""Run manifests: what every finished run did, so it can be undone.
+
+Each real run records one row per file it placed in DEST/.sorteo/runs.sqlite
+(paths relative to the run's origin and destination, plus the size and
+mtime the placed file had), and the folders it had to create. Undoing a run
+moves moved files back and deletes copies, in parallel, then removes the
+folders the run created once they are empty. A file whose size or mtime no
+longer matches, or whose original location is taken again, is left alone.
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+from .state import FLUSH_EVERY, connect_state, state_path
+
+MANIFEST_NAME = "runs.sqlite"
+UNDO_WORKERS = 8
+UNDO_BATCH = 2000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started REAL NOT NULL,
+    finished REAL,
+    status TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    files INTEGER NOT NULL DEFAULT 0,
+    options TEXT
+);
+CREATE TABLE IF NOT EXISTS entries (
+    run INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    src TEXT NOT NULL,
+    dst TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_run ON entries (run);
+CREATE TABLE IF NOT EXISTS dirs (
+    run INTEGER NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_run ON dirs (run);
+"""
+
+
+def _connect(dest, create):
+    return connect_state(dest, MANIFEST_NAME, _SCHEMA, create=create)
+
+
+def _relative(path, root):
+    """``path`` relative to ``root`` when it is below it, else absolute."""
+    path = os.path.abspath(path)
+    return os.path.relpath(path, root) if path.startswith(root + os.sep) else path
+
+
+class RunManifest:
+    """Records one run's placed files and created folders; safe to call from worker threads."""
+    def __init__(self, dest, options):
+        self.origin = os.path.abspath(options["origin"]); self.dest = os.path.abspath(dest)
+        self._lock = threading.Lock()
+        self._pending = []; self._dirs = []; self.count = 0
+        self._db = _connect(dest, create=True)
+        cursor = self._db.execute("INSERT INTO runs (started, status, operation, origin, dest, options) VALUES (?, 'running', ?, ?, ?, ?)",
+                                  (time.time(), options["operation"], self.origin, self.dest, json.dumps(options)))
+        self._db.commit()
+        self.run_id = cursor.lastrowid
+
+    def record(self, op, source, dest, st):
+        """Notes that ``dest`` now holds ``source``; ``op`` is 'move' (undo moves it back) or 'copy' (undo deletes it)."""
+        with self._lock:
+            self._pending.append((self.run_id, op, _relative(source, self.origin), _relative(dest, self.dest), st.st_size, st.st_mtime_ns))
+            self.count += 1
+            if len(self._pending) >= FLUSH_EVERY: self._flush()
+
+    def created_dirs(self, folders):
+        with self._lock: self._dirs.extend((self.run_id, _relative(folder, self.dest)) for folder in folders)
+
+    def _flush(self):
+        if self._pending: self._db.executemany("INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)", self._pending); self._pending.clear()
+        if self._dirs: self._db.executemany("INSERT INTO dirs VALUES (?, ?)", self._dirs); self._dirs.clear()
+        self._db.commit()
+
+    def close(self, status="complete"):
+        with self._lock:
+            if self._db is None: return
+            self._flush()
+            if self.count: self._db.execute("UPDATE runs SET finished = ?, status = ?, files = ? WHERE id = ?", (time.time(), status, self.count, self.run_id))
+            else: self._db.execute("DELETE FROM runs WHERE id = ?", (self.run_id,)) # nothing to undo
+            self._db.commit(); self._db.close(); self._db = None
+
+
+class RunRecord:
+    """A recorded run, as listed by :func:`list_runs`."""
+    def __init__(self, row):
+        self.id, self.started, self.finished, self.status, self.operation, self.origin, self.dest, self.files = row
+
+    @property
+    def undoable(self):
+        return self.status != "undone"
+
+    def describe(self):
+        started = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.started))
+        return f"run {self.id}: {self.operation} {self.origin} -> {self.dest}, {started}, {self.files:,} files ({self.status})"
+
+
+def list_runs(dest):
+    """Returns the runs recorded for ``dest``, newest first."""
+    db = _connect(dest, create=False)
+    if db is None: return []
+    try: return [RunRecord(row) for row in db.execute("SELECT id, started, finished, status, operation, origin, dest, files FROM runs ORDER BY id DESC")]
+    finally: db.close()
+
+
+def last_run(dest):
+    """The newest run of ``dest`` that can still be undone, or None."""
+    return next((run for run in list_runs(dest) if run.undoable), None)
+
+
+def _undo_entry(op, source, dest, size, mtime_ns):
+    """Reverses one placed file; returns 'restored', 'deleted' or the reason it was left alone."""
+    try: st = os.stat(dest)
+    except FileNotFoundError: return "missing"
+    if st.st_size != size or st.st_mtime_ns != mtime_ns: return "changed"
+    if op == "copy":
+        os.remove(dest); return "deleted"
+    if os.path.lexists(source): return "source taken"
+    os.makedirs(os.path.dirname(source), exist_ok=True)
+    shutil.move(dest, source); return "restored"
+
+
+def undo(dest, run_id=None, workers=UNDO_WORKERS, log=None):
+    """Undoes run ``run_id`` (default: the last undoable run) of ``dest``; returns {outcome: count}.
+
+    Files are reversed UNDO_BATCH at a time on ``workers`` threads. Entries
+    that are dealt with (undone, or gone) are dropped from the manifest, so
+    undoing a partly undone run again only retries the files left alone.
+    The sources undone are dropped from the incremental index too, so the
+    next incremental run sorts them again.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from .runindex import RunIndex, INDEX_NAME
+    log = log or (lambda message: None)
+    run = last_run(dest) if run_id is None else next((r for r in list_runs(dest) if r.id == run_id), None)
+    if run is None or not run.undoable: raise ValueError(f"No run to undo in {dest}." if run_id is None else f"Run {run_id} cannot be undone.")
+    log(f"Undoing {run.describe()}")
+    db = _connect(dest, create=False); counts = {}; undone_sources = []; settled = []
+    index = RunIndex(dest) if os.path.exists(state_path(dest, INDEX_NAME)) else None
+
+    def one(row):
+        rowid, op, src, dst, size, mtime_ns = row
+        source = os.path.join(run.origin, src); target = os.path.join(run.dest, dst)
+        try: outcome = _undo_entry(op, source, target, size, mtime_ns)
+        except OSError as e: log(f"Warning: Could not undo {target}: {e}."); return rowid, source, "failed"
+        if outcome == "restored": log(f"Moved back: {target} -> {source}")
+        elif outcome == "deleted": log(f"Deleted copy: {target}")
+        elif outcome == "changed": log(f"Warning: {target} changed after the run; leaving it in place.")
+        elif outcome == "source taken": log(f"Warning: {source} exists again; leaving {target} in place.")
+        else: log(f"Warning: {target} no longer exists.")
+        return rowid, source, outcome
+
+    try:
+        cursor = db.execute("SELECT rowid, op, src, dst, size, mtime_ns FROM entries WHERE run = ? ORDER BY rowid DESC", (run.id,))
+        with ThreadPoolExecutor(workers, thread_name_prefix="sorteo-undo") as pool:
+            while True:
+                rows = cursor.fetchmany(UNDO_BATCH)
+                if not rows: break
+                for rowid, source, outcome in pool.map(one, rows):
+                    counts[outcome] = counts.get(outcome, 0) + 1
+                    if outcome in ("restored", "deleted"): undone_sources.append(source)
+                    if outcome in ("restored", "deleted", "missing"): settled.append((rowid,))
+        db.executemany("DELETE FROM entries WHERE rowid = ?", settled)
+        if index is not None: index.forget(undone_sources)
+        folders = [os.path.join(run.dest, path) for (path,) in db.execute("SELECT path FROM dirs WHERE run = ?", (run.id,))]
+        for folder in sorted(folders, key=len, reverse=True): # deepest first, and only if the undo emptied it
+            try: os.rmdir(folder)
+            except OSError: pass
+        left = db.execute("SELECT COUNT(*) FROM entries WHERE run = ?", (run.id,)).fetchone()[0]
+        db.execute("UPDATE runs SET status = ? WHERE id = ?", ("partly undone" if left else "undone", run.id)); db.commit()
+    finally:
+        db.close()
+        if index is not None: index.close()
+    return counts
@@ -0,0 +1,93 @@
+"""Sort plans: the outcome of a dry run, saved as JSON lines and executable later.
+
+The first line is a header with the run's options; every further line is
+one file::
+
+    {"op": "move", "src": "/in/IMG_1.jpg", "dst": "/out/2024/MAR/IMG_1_1.jpg", "size": 2048, "mtime_ns": ...}
+
+``op`` is ``move`` or ``copy``, ``link`` (hardlink ``dst`` to the identical
+file ``dup``) or ``skip`` (``src`` duplicates ``dup``). Destination names
+already have collisions resolved, so executing a plan needs no discovery
+and no path rendering, only a stat to check the source has not changed.
+Being one record per line, plans can be diffed, grepped and filtered with
+ordinary tools as well as with :func:`filter_plan`.
+"""
+import fnmatch
+import json
+import os
+import time
+
+PLAN_VERSION = 1
+PLAN_OPS = ["move", "copy", "link", "skip"]
+
+
+class PlanError(ValueError):
+    """Raised for a file that is not a readable sort plan."""
+
+
+class PlanWriter:
+    """Streams plan records to ``path`` as a dry run decides them."""
+    def __init__(self, path, options):
+        self.path = path
+        self.count = 0
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(json.dumps({"sorteo_plan": PLAN_VERSION, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "options": options}) + "\n")
+
+    def add(self, op, source, dest, st, duplicate=None):
+        record = {"op": op, "src": source, "dst": dest,
+                  "size": st.st_size if st is not None else None, "mtime_ns": st.st_mtime_ns if st is not None else None}
+        if duplicate is not None: record["dup"] = duplicate
+        self._file.write(json.dumps(record) + "\n"); self.count += 1
+
+    def close(self):
+        if self._file is not None: self._file.close(); self._file = None
+
+
+def read_header(path):
+    """Returns the header dict of the plan at ``path``."""
+    with open(path, encoding="utf-8") as f:
+        try: header = json.loads(f.readline())
+        except ValueError: header = None
+    if not isinstance(header, dict) or header.get("sorteo_plan") != PLAN_VERSION or "options" not in header:
+        raise PlanError(f"{path} is not a Sorteo plan (version {PLAN_VERSION}).")
+    return header
+
+
+def read_records(path):
+    """Lazily yields the file records of the plan at ``path``."""
+    with open(path, encoding="utf-8") as f:
+        f.readline()
+        for number, line in enumerate(f, 2):
+            if not line.strip(): continue
+            try: record = json.loads(line)
+            except ValueError: raise PlanError(f"{path}, line {number}: not valid JSON.")
+            if record.get("op") not in PLAN_OPS or "src" not in record: raise PlanError(f"{path}, line {number}: not a plan record.")
+            yield record
+
+
+def filter_plan(records, ops=None, extensions=None, include=None, exclude=None):
+    """Yields the records that match every given criterion.
+
+    ``ops`` and ``extensions`` are collections (extensions without the dot,
+    compared case-insensitively); ``include`` and ``exclude`` are lists of
+    shell patterns matched against the source path.
+    """
+    extensions = {ext.lower().lstrip(".") for ext in extensions} if extensions else None
+    for record in records:
+        src = record["src"]
+        if ops and record["op"] not in ops: continue
+        if extensions is not None and os.path.splitext(src)[1][1:].lower() not in extensions: continue
+        if include and not any(fnmatch.fnmatch(src, pattern) for pattern in include): continue
+        if exclude and any(fnmatch.fnmatch(src, pattern) for pattern in exclude): continue
+        yield record
+
+
+def write_plan(path, header, records):
+    """Writes ``header`` and ``records`` as a new plan; returns the number of records."""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(header) + "\n")
+        for record in records: f.write(json.dumps(record) + "\n"); count += 1
+    return count
@@ -0,0 +1,122 @@
+"""Compact per-file results of a run, for the GUI's results table.
+
+A run of a million files must not cost a million widgets or a million
+dicts. Rows are stored column-wise: folders and extensions are interned
+(a run touches few of them), codes live in ``array`` columns, and only the
+file names are kept as one string each. Filtered views are arrays of row
+numbers that are extended with the new rows instead of being recomputed.
+"""
+import os
+import threading
+from array import array
+
+ACTIONS = ["move", "copy", "link", "skip"]
+STATUSES = ["done", "planned", "skipped", "failed"]
+_ACTION_CODES = {name: code for code, name in enumerate(ACTIONS)}
+_STATUS_CODES = {name: code for code, name in enumerate(STATUSES)}
+
+
+class _Interner:
+    __slots__ = ("ids", "values")
+
+    def __init__(self):
+        self.ids = {}; self.values = []
+
+    def __call__(self, value):
+        index = self.ids.get(value)
+        if index is None: index = self.ids[value] = len(self.values); self.values.append(value)
+        return index
+
+
+class ResultStore:
+    """Append-only table of (source, destination, action, status); safe to append from worker threads."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._folders = _Interner(); self._exts = _Interner()
+        self._src_dir = array("I"); self._dst_dir = array("I"); self._ext = array("I")
+        self._action = array("B"); self._status = array("B")
+        self._src_name = []; self._dst_name = []  # dst name is None when it equals the source name
+
+    def __len__(self):
+        return len(self._status)  # appended last, so every column has this many rows
+
+    def add(self, source, dest, action, status):
+        src_dir, src_name = os.path.split(source)
+        dst_dir, dst_name = os.path.split(dest) if dest else ("", None)
+        dot = src_name.rfind(".")
+        ext = src_name[dot + 1:].lower() if dot > 0 else ""
+        with self._lock:
+            self._src_dir.append(self._folders(src_dir)); self._src_name.append(src_name)
+            self._dst_dir.append(self._folders(dst_dir)); self._dst_name.append(None if dst_name == src_name else dst_name)
+            self._ext.append(self._exts(ext))
+            self._action.append(_ACTION_CODES[action]); self._status.append(_STATUS_CODES[status])
+
+    def row(self, index):
+        """Returns (source, destination, action, status) for row ``index``."""
+        src_name = self._src_name[index]; dst_name = self._dst_name[index]; dst_dir = self._folders.values[self._dst_dir[index]]
+        return (os.path.join(self._folders.values[self._src_dir[index]], src_name),
+                os.path.join(dst_dir, dst_name or src_name) if dst_dir else "",
+                ACTIONS[self._action[index]], STATUSES[self._status[index]])
+
+    def counts(self):
+        """Rows per status."""
+        totals = dict.fromkeys(STATUSES, 0)
+        for code in self._status: totals[STATUSES[code]] += 1
+        return totals
+
+    def view(self, status=None, extension=None, text=None):
+        return ResultView(self, status, extension, text)
+
+
+class ResultView:
+    """The row numbers of a store that match a status, an extension and a search text.
+
+    :meth:`update` only tests the rows added since the last call, so keeping
+    a filter applied while a run adds rows stays cheap. The search text is
+    matched against each interned folder once and against file names per
+    row, so it finds text within a folder path or a file name.
+    """
+    def __init__(self, store, status=None, extension=None, text=None):
+        self.store = store
+        self.rows = array("I")
+        self._checked = 0
+        self._status = STATUSES.index(status) if status else None
+        self._extension = extension.lower().lstrip(".") if extension else None
+        self._text = text.lower() if text else None
+        self._folder_hits = {}  # folder id -> folder contains the search text
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _folder_matches(self, folder_id):
+        hit = self._folder_hits.get(folder_id)
+        if hit is None: hit = self._folder_hits[folder_id] = self._text in self.store._folders.values[folder_id].lower()
+        return hit
+
+    @property
+    def complete(self):
+        return self._checked >= len(self.store)
+
+    def update(self, max_rows=None):
+        """Tests up to ``max_rows`` rows added to the store since the last call; returns True if the view grew."""
+        store = self.store; end = len(store); start = self._checked
+        if max_rows is not None: end = min(end, start + max_rows)
+        if start >= end: return False
+        status = self._status; text = self._text
+        ext = None
+        if self._extension is not None:
+            ext = store._exts.ids.get(self._extension)
+            if ext is None: self._checked = end; return False
+        before = len(self.rows)
+        for index in range(start, end):
+            if status is not None and store._status[index] != status: continue
+            if ext is not None and store._ext[index] != ext: continue
+            if text is not None and not (text in store._src_name[index].lower() or self._folder_matches(store._src_dir[index])
+                                         or self._folder_matches(store._dst_dir[index])
+                                         or (store._dst_name[index] is not None and text in store._dst_name[index].lower())): continue
+            self.rows.append(index)
+        self._checked = end
+        return len(self.rows) > before
+
+    def row(self, position):
+        return self.store.row(self.rows[position])
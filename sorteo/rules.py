@@ -0,0 +1,151 @@
+"""Routing rules: send files to their own folder template by type, name, size and age.
+
+A rule is one line, conditions then ``->`` then a template::
+
+    *.raw >50MB -> RAW/{year}
+    invoice_* -> Finance/{year}/{month}
+    older:2y -> Cold
+
+Conditions are ANDed: ``*.ext`` (a file type), any other shell pattern
+(matched case-insensitively against the file name), ``>SIZE`` / ``<SIZE``
+(``50MB``, ``1.5GB``, plain bytes) and ``older:AGE`` / ``newer:AGE``
+(``12h``, ``30d``, ``8w``, ``6m``, ``2y``; the age of the date the templates
+use). Rules are tried in order and the first match wins; files no rule
+matches go to the run's structure if they are of a selected type, and are
+left alone if only a rule's type brought them in.
+
+The rules are compiled once per run: name patterns become one precompiled
+regex each, and every extension gets the tuple of rules that can apply to
+it (its own rules and the rules without a type, in rule order), so a file
+is only tested against the few rules that mention its type.
+"""
+import fnmatch
+import re
+import time
+
+from .discovery import TypeMatcher
+from .templates import CompiledTemplate, TemplateError
+
+SIZE_UNITS = {"": 1, "B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30, "TB": 1 << 40}
+AGE_UNITS = {"h": 3600, "d": 86400, "w": 7 * 86400, "m": 30 * 86400, "y": 365 * 86400}
+_SIZE_RE = re.compile(r"([<>])(\d+(?:\.\d+)?)\s*([KMGT]?B?)", re.IGNORECASE)
+_AGE_RE = re.compile(r"(older|newer):(\d+(?:\.\d+)?)([hdwmy]?)", re.IGNORECASE)
+_TYPE_RE = re.compile(r"\*\.([^*?\[\]]+)")
+
+
+class RuleError(TemplateError):
+    """Raised for a rule that cannot be parsed."""
+
+
+def _extension(name):
+    dot = name.rfind(".")
+    return name[dot + 1:].lower() if dot > 0 else ""
+
+
+class Rule:
+    """One parsed rule; ``matches(name, st, when, now)`` tests everything but the type."""
+    __slots__ = ("text", "types", "compound", "regex", "min_size", "max_size", "older", "newer", "template")
+
+    def __init__(self, text, topic="", base="", date_source="created"):
+        self.text = text
+        conditions, arrow, pattern = text.partition("->")
+        pattern = pattern.strip()
+        if not arrow or not pattern: raise RuleError(f"Rule needs '-> folder template': {text}")
+        types = []; globs = []
+        self.min_size = self.max_size = self.older = self.newer = None
+        for token in conditions.split():
+            size = _SIZE_RE.fullmatch(token); age = _AGE_RE.fullmatch(token); ext = _TYPE_RE.fullmatch(token)
+            if size:
+                unit = size.group(3).upper()
+                value = int(float(size.group(2)) * SIZE_UNITS[unit if unit.endswith("B") else unit + "B" if unit else ""])
+                if size.group(1) == ">": self.min_size = value
+                else: self.max_size = value
+            elif age:
+                seconds = float(age.group(2)) * AGE_UNITS[age.group(3).lower() or "d"]
+                if age.group(1).lower() == "older": self.older = seconds
+                else: self.newer = seconds
+            elif ext: types.append(ext.group(1).lower())
+            elif token[0] in "<>" or "older:" in token.lower() or "newer:" in token.lower():
+                raise RuleError(f"Cannot read the condition '{token}' (use e.g. >50MB, <1.5GB, older:2y, newer:30d): {text}")
+            else: globs.append(token)
+        self.types = frozenset(t for t in types if "." not in t)
+        self.compound = tuple(f".{t}" for t in types if "." in t)
+        self.regex = tuple(re.compile(fnmatch.translate(g.lower())) for g in globs)
+        self.template = CompiledTemplate(pattern, topic, base, date_source)
+
+    @property
+    def needs_stat(self):
+        return self.min_size is not None or self.max_size is not None or self.older is not None or self.newer is not None
+
+    @property
+    def needs_date(self):
+        return self.older is not None or self.newer is not None
+
+    def matches(self, lower_name, st, when, now):
+        if self.compound and not lower_name.endswith(self.compound) and _extension(lower_name) not in self.types: return False
+        for regex in self.regex:
+            if not regex.match(lower_name): return False
+        if self.min_size is not None or self.max_size is not None:
+            if st is None: return False
+            if self.min_size is not None and st.st_size <= self.min_size: return False
+            if self.max_size is not None and st.st_size >= self.max_size: return False
+        if self.older is not None or self.newer is not None:
+            if when is None: return False
+            if self.older is not None and now - when < self.older: return False
+            if self.newer is not None and now - when > self.newer: return False
+        return True
+
+
+class RuleRouter:
+    """Picks the template for each file from ordered rules; a drop-in for :class:`CompiledTemplate`.
+
+    ``render(name, st, taken)`` renders the first matching rule's template,
+    or ``default``'s when no rule matches. With ``file_types`` given, a file
+    that matches no rule and none of those types renders to None: it was
+    only discovered because a rule names its type.
+    """
+    def __init__(self, rules, default, topic="", base="", date_source="created", file_types=None):
+        self.default = default
+        self.selected = TypeMatcher(file_types) if file_types is not None else None
+        self.rules = []
+        for number, text in enumerate(rules, 1):
+            try: self.rules.append(Rule(text, topic, base, date_source))
+            except TemplateError as e: raise RuleError(f"Rule {number}: {e}")
+        self.date_attr = default.date_attr
+        # 'tar.gz' is filed under 'gz'; Rule.matches checks the full suffix
+        keys = [rule.types | {c.rpartition(".")[2] for c in rule.compound} for rule in self.rules]
+        self.types = frozenset().union(*(rule.types for rule in self.rules))
+        templates = [rule.template for rule in self.rules] + [default]
+        self.needs_date = any(t.needs_date for t in templates) or any(rule.needs_date for rule in self.rules)
+        self.needs_stat = self.needs_date or any(t.needs_stat for t in templates) or any(rule.needs_stat for rule in self.rules)
+        # extension -> the rules that can match it, in rule order; untyped rules apply to every extension
+        self._generic = tuple(rule for rule, exts in zip(self.rules, keys) if not exts)
+        self._by_ext = {ext: tuple(rule for rule, exts in zip(self.rules, keys) if ext in exts or not exts) for ext in frozenset().union(*keys)}
+
+    @property
+    def extensions(self):
+        """Every extension a rule names, compound ones included, for discovery."""
+        return sorted(self.types | {c[1:] for rule in self.rules for c in rule.compound})
+
+    def rule_for(self, name, st=None, taken=None):
+        """The first rule ``name`` matches, or None."""
+        lower = name.lower()
+        candidates = self._by_ext.get(_extension(lower), self._generic)
+        if not candidates: return None
+        when = taken if taken is not None else (getattr(st, self.date_attr) if st is not None else None)
+        now = time.time()
+        for rule in candidates:
+            if rule.matches(lower, st, when, now): return rule
+        return None
+
+    def render(self, name, st=None, taken=None):
+        rule = self.rule_for(name, st, taken)
+        if rule is not None: return rule.template.render(name, st, taken)
+        if self.selected is not None and not self.selected(name): return None
+        return self.default.render(name, st, taken)
+
+
+def read_rules(path):
+    """Returns the rules in a text file: one per line, blank lines and '#' comments ignored."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
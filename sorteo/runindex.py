@@ -0,0 +1,58 @@
+"""Persistent record of already-sorted files, for incremental re-runs."""
+import os
+import time
+
+from .state import StateCache
+
+INDEX_NAME = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sorted (
+    source TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    dest TEXT NOT NULL,
+    operation TEXT NOT NULL,
+    sorted_at REAL NOT NULL
+)
+"""
+
+
+class RunIndex(StateCache):
+    """SQLite index in ``dest/.sorteo`` of every file a run has placed.
+
+    Files are keyed by absolute source path and compared by size, mtime and
+    inode, so a nightly run only processes files that are new or changed.
+    Results are written in batches of FLUSH_EVERY; if a run dies, at most
+    the last batch is forgotten and those files are sorted again. Opened
+    read-only (and never created) for dry runs.
+    """
+    def __init__(self, dest, read_only=False):
+        super().__init__(dest, INDEX_NAME, _SCHEMA, "INSERT OR REPLACE INTO sorted VALUES (?, ?, ?, ?, ?, ?, ?)", read_only)
+
+    @staticmethod
+    def _key(source_path):
+        return os.path.abspath(source_path)
+
+    def is_unchanged(self, source_path, st):
+        """True if ``source_path`` was sorted before and its size, mtime and inode still match."""
+        if self._db is None: return False
+        key = self._key(source_path)
+        with self._lock: # pending rows too: a watch keeps the index open across rescans
+            row = self._pending.get(key)
+            if row is not None: row = row[1:4]
+            else: row = self._db.execute("SELECT size, mtime_ns, inode FROM sorted WHERE source = ?", (key,)).fetchone()
+        return row is not None and row == (st.st_size, st.st_mtime_ns, st.st_ino)
+
+    def record(self, source_path, st, dest_path, operation):
+        if self.read_only or self._db is None: return
+        with self._lock:
+            self._add((self._key(source_path), st.st_size, st.st_mtime_ns, st.st_ino, dest_path, operation, time.time()))
+
+    def forget(self, source_paths):
+        """Drops ``source_paths`` from the index, e.g. after their run was undone."""
+        if self.read_only or self._db is None: return
+        with self._lock:
+            self._flush()
+            self._db.executemany("DELETE FROM sorted WHERE source = ?", ((self._key(p),) for p in source_paths)); self._db.commit()
@@ -0,0 +1,42 @@
+"""Startup timing for the desktop app.
+
+Set SORTEO_STARTUP_REPORT to a file path to append one JSON line per launch
+(import breakdown, time to first window, time until fully loaded), or to
+'-' to print it to stderr. Times are measured from the first line of app.py.
+"""
+import json
+import os
+import sys
+import time
+
+REPORT_ENV = "SORTEO_STARTUP_REPORT"
+
+
+class StartupTimer:
+    def __init__(self, t0=None):
+        self.t0 = t0 if t0 is not None else time.perf_counter()
+        self._last = self.t0
+        self.steps = {}
+
+    def mark(self, name):
+        """Records the time since the previous mark under ``name``."""
+        now = time.perf_counter()
+        self.steps[name] = round((now - self._last) * 1000, 1); self._last = now
+
+    def elapsed_ms(self):
+        return round((time.perf_counter() - self.t0) * 1000, 1)
+
+    def report(self, version, **extra):
+        target = os.environ.get(REPORT_ENV)
+        if not target: return None
+        record = {"version": version, "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "frozen": bool(getattr(sys, "frozen", False)),
+                  "steps_ms": self.steps, "total_ms": self.elapsed_ms()}
+        record.update(extra)
+        line = json.dumps(record)
+        try:
+            if target == "-": print(line, file=sys.stderr)
+            else:
+                with open(target, "a", encoding="utf-8") as f: f.write(line + "\n")
+        except OSError as e:
+            print(f"Error writing startup report: {e}", file=sys.stderr)
+        return record
@@ -0,0 +1,60 @@
+"""Location of Sorteo's own bookkeeping files inside a destination folder, and the SQLite caches kept there."""
+import os
+import threading
+
+STATE_DIR = ".sorteo"
+FLUSH_EVERY = 500  # rows a cache buffers before writing them in one transaction
+
+
+def state_path(dest, name, create=False):
+    """Returns ``dest/.sorteo/name``, creating the .sorteo folder when ``create`` is set."""
+    folder = os.path.join(dest, STATE_DIR)
+    if create: os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, name)
+
+
+def connect_state(dest, name, schema, read_only=False, create=True):
+    """Opens the SQLite database ``dest/.sorteo/name``; None if it does not exist and may not be created.
+
+    Read-only connections (dry runs) never create the file or the folder.
+    Writable ones use WAL with synchronous=NORMAL and apply ``schema``.
+    Connections may be shared between threads; callers hold their own lock.
+    """
+    import sqlite3 # deferred: runs that keep no state never load it
+    path = state_path(dest, name, create=create and not read_only)
+    if (read_only or not create) and not os.path.exists(path): return None
+    if read_only: return sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    db = sqlite3.connect(path, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL"); db.execute("PRAGMA synchronous=NORMAL")
+    db.executescript(schema)
+    return db
+
+
+class StateCache:
+    """A table in DEST/.sorteo keyed by its first column, written in batches of FLUSH_EVERY.
+
+    Subclasses call :meth:`_add` with ``self._lock`` held; a newer row for a
+    key replaces a pending one. ``insert`` is the INSERT OR REPLACE statement
+    for a row. Nothing is written when ``read_only`` is set.
+    """
+    def __init__(self, dest, name, schema, insert, read_only=False):
+        self.read_only = read_only
+        self._lock = threading.Lock()
+        self._insert = insert
+        self._pending = {}  # key -> row not written yet
+        self._db = connect_state(dest, name, schema, read_only)
+
+    def _add(self, row):
+        self._pending[row[0]] = row
+        if len(self._pending) >= FLUSH_EVERY: self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._db.executemany(self._insert, self._pending.values())
+            self._db.commit(); self._pending.clear()
+
+    def close(self):
+        with self._lock:
+            if self._db is None: return
+            if not self.read_only: self._flush()
+            self._db.close(); self._db = None
@@ -0,0 +1,90 @@
+"""Per-run counters and stage timers, with live throughput/ETA and a summary."""
+import os
+import threading
+import time
+
+TIMERS = ("discovery", "path_rendering", "io")
+COUNTERS = ("files_discovered", "files_processed", "files_skipped", "duplicates", "bytes_processed",
+            "stat_calls", "makedirs_calls", "dir_scans", "collision_retries", "metadata_reads")
+
+
+def format_duration(seconds):
+    if seconds < 60: return f"{seconds:.1f}s"
+    seconds = int(seconds + 0.5)
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+
+class RunStats:
+    """Counters and stage timers for one run; safe to update from any thread.
+
+    Stage times are summed over threads, so with several workers ``io`` can
+    exceed the wall-clock ``elapsed``.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = time.perf_counter(); self.finished = None
+        self.discovery_done = False
+        self.counts = dict.fromkeys(COUNTERS, 0)
+        self.seconds = dict.fromkeys(TIMERS, 0.0)
+        self._copying = {}  # dest path -> (bytes done, size) of streamed copies in flight
+
+    def add(self, **counts):
+        with self._lock:
+            for name, value in counts.items(): self.counts[name] += value
+
+    def add_time(self, timer, seconds):
+        with self._lock: self.seconds[timer] += seconds
+
+    def file_done(self, nbytes):
+        """Counts one processed file; returns (processed, discovered) for progress reporting."""
+        with self._lock:
+            counts = self.counts
+            counts["files_processed"] += 1; counts["bytes_processed"] += nbytes
+            return counts["files_processed"], counts["files_discovered"]
+
+    def copy_progress(self, path, done, size):
+        """Records a streamed copy's progress; returns the copies in flight as a fraction of files done."""
+        with self._lock:
+            if done >= size: self._copying.pop(path, None)
+            else: self._copying[path] = (done, size)
+            return sum(d / s for d, s in self._copying.values())
+
+    def finish(self):
+        self.discovery_done = True
+        if self.finished is None: self.finished = time.perf_counter()
+
+    def snapshot(self):
+        """Current numbers plus files/s, MB/s and (once discovery has finished) ETA in seconds."""
+        with self._lock:
+            counts = dict(self.counts); seconds = dict(self.seconds)
+            copying = max(self._copying.items(), key=lambda item: item[1][1], default=None)
+            in_flight = sum(done for done, _ in self._copying.values())
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        files_per_s = counts["files_processed"] / elapsed if elapsed > 0 else 0.0
+        remaining = counts["files_discovered"] - counts["files_processed"]
+        eta = remaining / files_per_s if self.discovery_done and files_per_s > 0 else None
+        return dict(counts, elapsed_s=round(elapsed, 3), files_per_s=round(files_per_s, 1),
+                    mb_per_s=round((counts["bytes_processed"] + in_flight) / elapsed / 1e6, 2) if elapsed > 0 else 0.0,
+                    eta_s=round(eta, 1) if eta is not None else None, discovery_done=self.discovery_done,
+                    stage_seconds={name: round(value, 3) for name, value in seconds.items()},
+                    copying={"path": copying[0], "done": copying[1][0], "size": copying[1][1]} if copying else None)
+
+    def progress_text(self, snapshot=None):
+        s = snapshot or self.snapshot()
+        found = f"{s['files_discovered']:,}" if s["discovery_done"] else f"{s['files_discovered']:,}+"
+        eta = f"ETA {format_duration(s['eta_s'])}" if s["eta_s"] is not None else "scanning..."
+        text = f"{s['files_processed']:,} / {found} files  ·  {s['files_per_s']:,.0f} files/s  ·  {s['mb_per_s']:,.1f} MB/s  ·  {eta}"
+        if s["copying"]: # the largest file being streamed, so a long copy visibly moves
+            c = s["copying"]; text += f"  ·  {os.path.basename(c['path'])} {c['done'] / 1e9:,.1f} / {c['size'] / 1e9:,.1f} GB"
+        return text
+
+    def summary_lines(self):
+        s = self.snapshot(); t = s["stage_seconds"]
+        return [
+            f"Files: {s['files_processed']:,} processed of {s['files_discovered']:,} found"
+            f" ({s['files_skipped']:,} skipped, {s['duplicates']:,} duplicates)",
+            f"Throughput: {s['files_per_s']:,.1f} files/s, {s['mb_per_s']:,.2f} MB/s over {format_duration(s['elapsed_s'])}",
+            f"Time: discovery {t['discovery']:.2f}s, path rendering {t['path_rendering']:.2f}s, I/O {t['io']:.2f}s",
+            f"Calls: {s['stat_calls']:,} stat, {s['makedirs_calls']:,} makedirs, {s['dir_scans']:,} folder scans, "
+            f"{s['collision_retries']:,} collision retries",
+        ]
@@ -0,0 +1,121 @@
+"""Destination-path templates such as '{type}/{year}-{month}'.
+
+A template is compiled once per run into path segments made of literals and
+field names. Every field is derived from a small per-file key (capture day,
+extension, size bucket, name hash), and the rendered folder is memoized per
+key, so for most files rendering is a single dict lookup.
+"""
+import bisect
+import os
+import re
+import time
+import zlib
+from datetime import date
+
+STRUCTURE_TEMPLATES = {
+    "Year/Month": "{year}/{month}",
+    "Year/Month/Day": "{year}/{month}/{day}",
+    "File Type": "{type}",
+    "File Type/Year/Month": "{type}/{year}/{month}",
+    "Topic/Year/Month": "{topic}/{year}/{month}",
+}
+
+DATE_FIELDS = frozenset(["year", "month", "day", "week"])
+EXT_FIELDS = frozenset(["type", "ext_upper"])
+FIELDS = DATE_FIELDS | EXT_FIELDS | frozenset(["topic", "size_bucket", "hash2"])
+FIELD_HELP = "{type} {ext_upper} {topic} {year} {month} {day} {week} {size_bucket} {hash2}"
+
+SIZE_BUCKET_LIMITS = [1 << 20, 10 << 20, 100 << 20, 1 << 30]
+SIZE_BUCKET_NAMES = ["under-1MB", "1-10MB", "10-100MB", "100MB-1GB", "over-1GB"]
+
+MAX_CACHED_FOLDERS = 100000
+_FIELD_RE = re.compile(r"\{([^{}]*)\}")
+
+
+class TemplateError(ValueError):
+    """Raised for a template that cannot be compiled, e.g. an unknown field."""
+
+
+def _date_values(day, iso_year=False):
+    """Date fields for a (year, month, day); ``iso_year`` makes {year} the ISO year {week} belongs to."""
+    if day is None: return {"year": "", "month": "", "day": "", "week": ""}
+    d = date(*day); iso = d.isocalendar()
+    return {"year": str(iso[0] if iso_year else d.year), "month": d.strftime('%b').upper(), "day": f"{d.day:02d}", "week": f"{iso[1]:02d}"}
+
+
+class CompiledTemplate:
+    """A destination template compiled for one run.
+
+    ``render(name, st, taken)`` returns the target folder below ``base`` for
+    a file called ``name`` with stat result ``st`` (``st`` may be None when
+    the template does not need it, or when stat failed; date fields are then
+    left empty and their path segments dropped). ``taken`` is a capture
+    timestamp that, when given, replaces the stat date; ``date_source``
+    picks that stat date: st_ctime for 'created', else st_mtime.
+    """
+    def __init__(self, pattern, topic="", base="", date_source="created"):
+        self.pattern = pattern
+        self.topic = topic
+        self.base = base
+        self.date_attr = "st_ctime" if date_source == "created" else "st_mtime"
+        self.segments = []
+        for part in pattern.replace("\\", "/").split("/"):
+            if not part: continue
+            pieces = []; last = 0
+            for match in _FIELD_RE.finditer(part):
+                field = match.group(1)
+                if field not in FIELDS: raise TemplateError(f"Unknown field {{{field}}} in structure. Use: {FIELD_HELP}")
+                if match.start() > last: pieces.append((False, part[last:match.start()]))
+                pieces.append((True, field)); last = match.end()
+            if last < len(part): pieces.append((False, part[last:]))
+            if any(not is_field and ("{" in text or "}" in text) for is_field, text in pieces):
+                raise TemplateError(f"Unbalanced braces in structure: {part}")
+            self.segments.append(pieces)
+        self.fields = frozenset(text for pieces in self.segments for is_field, text in pieces if is_field)
+        self.needs_date = bool(self.fields & DATE_FIELDS)
+        self.needs_ext = bool(self.fields & EXT_FIELDS)
+        self.needs_size = "size_bucket" in self.fields
+        self.needs_hash = "hash2" in self.fields
+        self.needs_stat = self.needs_date or self.needs_size
+        self._cache = {}
+
+    def key(self, name, st, taken=None):
+        """The per-file values the rendered folder depends on."""
+        day = None
+        if self.needs_date:
+            if taken is not None: day = time.localtime(taken)[:3]
+            elif st is not None: day = time.localtime(getattr(st, self.date_attr))[:3]
+        ext = None
+        if self.needs_ext:
+            dot = name.rfind(".")
+            ext = name[dot + 1:].lower() if dot > 0 and dot < len(name) - 1 else ""
+        bucket = bisect.bisect_right(SIZE_BUCKET_LIMITS, st.st_size) if self.needs_size and st is not None else None
+        name_hash = zlib.crc32(name.encode("utf-8", "surrogateescape")) & 0xff if self.needs_hash else None
+        return day, ext, bucket, name_hash
+
+    def render(self, name, st=None, taken=None):
+        key = self.key(name, st, taken)
+        folder = self._cache.get(key)
+        if folder is None:
+            folder = self._render_key(key)
+            if len(self._cache) >= MAX_CACHED_FOLDERS: self._cache.clear()
+            self._cache[key] = folder
+        return folder
+
+    def _render_key(self, key):
+        day, ext, bucket, name_hash = key
+        values = {"topic": self.topic}
+        if self.needs_date: values.update(_date_values(day, "week" in self.fields))  # 2024-12-30 is in 2025/01, not 2024/01
+        if self.needs_ext: values["type"] = ext or "other"; values["ext_upper"] = (ext or "other").upper()
+        if self.needs_size: values["size_bucket"] = SIZE_BUCKET_NAMES[bucket] if bucket is not None else ""
+        if self.needs_hash: values["hash2"] = f"{name_hash:02x}"
+        parts = []
+        for pieces in self.segments:
+            part = "".join(values[text] if is_field else text for is_field, text in pieces)
+            if part: parts.append(part)
+        return os.path.join(self.base, *parts)
+
+
+def template_for(structure, custom_pattern=""):
+    """Returns the template string behind a structure menu choice."""
+    return custom_pattern if structure == "Custom..." else STRUCTURE_TEMPLATES[structure]
@@ -0,0 +1,209 @@
+"""Watch mode: keep sorting files as they arrive in the origin folder.
+
+On Linux the watcher listens to inotify (through ctypes, no extra
+dependency); elsewhere, or when inotify is unavailable or out of watches, it
+rescans the origin every ``poll_seconds``. Either way a new file is only
+handed over once its size and mtime have stayed the same for
+``settle_seconds``, so files still being copied in are left alone, and
+settled files are handed over in batches. Memory is bounded by the number
+of folders watched and files waiting to settle, never by uptime; past
+MAX_PENDING waiting files new ones are dropped and picked up by a rescan.
+"""
+import os
+import select
+import struct
+import sys
+import time
+
+from .discovery import TypeMatcher, scan_files
+
+SETTLE_SECONDS = 2.0
+POLL_SECONDS = 5.0
+TICK_SECONDS = 0.5
+BATCH_SIZE = 500
+MAX_PENDING = 100000
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+_EVENT = struct.Struct("iIII")
+
+
+def _norm(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+class WatchedFile:
+    """The DirEntry-like record the engine plans from: ``path``, ``name`` and a cached ``stat()``."""
+    __slots__ = ("path", "name", "_st")
+
+    def __init__(self, path, st):
+        self.path = path; self.name = os.path.basename(path); self._st = st
+
+    def stat(self):
+        return self._st
+
+
+class _Inotify:
+    """Minimal inotify binding; raises OSError when inotify is not available."""
+    def __init__(self):
+        import ctypes, ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0: self._raise()
+        self.paths = {}  # watch descriptor -> folder
+
+    def _raise(self):
+        errno = self._get_errno()
+        raise OSError(errno, os.strerror(errno))
+
+    def add(self, folder):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(folder), _WATCH_MASK)
+        if wd < 0: self._raise()
+        self.paths[wd] = folder
+
+    def read(self, timeout):
+        """Returns (path, is_dir) events, with (None, False) for a queue overflow."""
+        if not select.select([self.fd], [], [], timeout)[0]: return []
+        events = []
+        while True:
+            try: data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError: break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset); offset += _EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b"\0")); offset += length
+                if mask & IN_Q_OVERFLOW: events.append((None, False))
+                elif mask & IN_IGNORED: self.paths.pop(wd, None)
+                elif wd in self.paths and name: events.append((os.path.join(self.paths[wd], name), bool(mask & IN_ISDIR)))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Reports settled matching files under ``origin`` in batches, until told to stop."""
+    def __init__(self, origin, file_types, recursive=True, exclude=None, settle_seconds=SETTLE_SECONDS,
+                 poll_seconds=POLL_SECONDS, batch_size=BATCH_SIZE, use_inotify=True, log=None):
+        if batch_size < 1: raise ValueError("batch_size must be at least 1")
+        if settle_seconds < 0 or poll_seconds < 0: raise ValueError("settle_seconds and poll_seconds cannot be negative")
+        self.origin = origin
+        self.file_types = file_types
+        self.recursive = recursive
+        self.exclude = exclude
+        self.settle_seconds = settle_seconds
+        self.poll_seconds = poll_seconds
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.matches = TypeMatcher(file_types)
+        self._excluded = _norm(exclude) if exclude else None
+        self._pending = {}   # path -> (size, mtime_ns, unchanged since)
+        self._known = {}     # polling only: path -> (size, mtime_ns) at the last scan
+        self._rescan = True
+        self._inotify = None
+        if use_inotify and sys.platform.startswith("linux"):
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                self.log(f"Warning: inotify is not available ({e}); checking for new files every {poll_seconds:g}s instead.")
+
+    @property
+    def kind(self):
+        return "inotify" if self._inotify is not None else f"polling every {self.poll_seconds:g}s"
+
+    @classmethod
+    def for_options(cls, options, **kwargs):
+        return cls(options.origin, options.scan_types(), options.recursive, exclude=options.dest, **kwargs)
+
+    def _watch_tree(self, folder):
+        """Adds inotify watches for ``folder`` and, when recursive, the folders below it."""
+        stack = [folder]
+        while stack:
+            current = stack.pop()
+            if self._excluded and _norm(current) == self._excluded: continue
+            try:
+                self._inotify.add(current)
+            except OSError as e: # usually fs.inotify.max_user_watches
+                self.log(f"Warning: Cannot watch {current} ({e}); checking for new files every {self.poll_seconds:g}s instead.")
+                self._inotify.close(); self._inotify = None; self._rescan = True
+                return
+            if not self.recursive: continue
+            try:
+                with os.scandir(current) as it:
+                    stack.extend(e.path for e in it if e.is_dir(follow_symlinks=False))
+            except OSError:
+                pass
+
+    def _candidate(self, path, st=None):
+        if path in self._pending: return
+        if len(self._pending) >= MAX_PENDING: self._rescan = True; return
+        if st is None:
+            try: st = os.stat(path)
+            except OSError: return
+        self._pending[path] = (st.st_size, st.st_mtime_ns, time.monotonic())
+
+    def _scan(self):
+        """Full scan of the origin: every matching file not seen before (or changed) becomes a candidate."""
+        self._rescan = False
+        if self._inotify is not None:
+            for entry in scan_files(self.origin, self.file_types, self.recursive, exclude=self.exclude):
+                try: self._candidate(entry.path, entry.stat())
+                except OSError: pass
+            return
+        known = {}
+        for entry in scan_files(self.origin, self.file_types, self.recursive, exclude=self.exclude):
+            try: st = entry.stat()
+            except OSError: continue
+            known[entry.path] = sig = (st.st_size, st.st_mtime_ns)
+            if self._known.get(entry.path) != sig: self._candidate(entry.path, st)
+        self._known = known
+
+    def _handle(self, events):
+        for path, is_dir in events:
+            if path is None: self._rescan = True # the kernel dropped events
+            elif is_dir:
+                if self.recursive:
+                    self._watch_tree(path)
+                    if self._inotify is None: return
+                    for entry in scan_files(path, self.file_types, True, exclude=self.exclude): self._candidate(entry.path)
+            elif self.matches(os.path.basename(path)):
+                self._candidate(path)
+
+    def _settled(self):
+        """Removes and returns the pending files whose size and mtime stayed put for settle_seconds."""
+        now = time.monotonic(); ready = []
+        for path, (size, mtime_ns, since) in list(self._pending.items()):
+            if now - since < self.settle_seconds: continue # each file is checked once per settle period
+            try: st = os.stat(path)
+            except OSError: del self._pending[path]; continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime_ns): self._pending[path] = (st.st_size, st.st_mtime_ns, now)
+            else: del self._pending[path]; ready.append(WatchedFile(path, st))
+        return ready
+
+    def batches(self, stop):
+        """Yields lists of settled WatchedFile objects, at most batch_size at a time, until ``stop`` is set."""
+        try:
+            if self._inotify is not None: self._watch_tree(self.origin)
+            next_poll = 0.0
+            while not stop.is_set():
+                if self._inotify is not None:
+                    self._handle(self._inotify.read(TICK_SECONDS))
+                else:
+                    stop.wait(TICK_SECONDS)
+                    if time.monotonic() >= next_poll: self._rescan = True; next_poll = time.monotonic() + self.poll_seconds
+                if self._rescan: self._scan()
+                ready = self._settled()
+                for start in range(0, len(ready), self.batch_size):
+                    if stop.is_set(): return
+                    yield ready[start:start + self.batch_size]
+        finally:
+            if self._inotify is not None: self._inotify.close(); self._inotify = None